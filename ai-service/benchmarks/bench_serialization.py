@@ -0,0 +1,91 @@
+"""
+Classification Response Serialization Benchmark
+Compares the response_model path with the fast orjson path
+
+Usage:
+    python -m benchmarks.bench_serialization [--detections 50] [--iterations 2000]
+"""
+
+import json
+import time
+import random
+import argparse
+
+from fastapi.encoders import jsonable_encoder
+
+from src.config import ClassificationResponse
+from src.responses import shape_classification, orjson
+
+
+def make_result(num_detections: int) -> dict:
+    """Build a classify_issue result with num_detections detections"""
+    classes = ['pothole', 'garbage', 'cow', 'manhole', 'car', 'person']
+    detections = sorted([
+        {
+            'class_name': random.choice(classes),
+            'confidence': random.random(),
+            'bbox': [random.uniform(0, 640) for _ in range(4)]
+        }
+        for _ in range(num_detections)
+    ], key=lambda d: d['confidence'], reverse=True)
+
+    return {
+        'success': True,
+        'issue_type': 'pothole',
+        'confidence': detections[0]['confidence'] if detections else 0.0,
+        'ai_class': 'pothole',
+        'alternative_classes': [
+            {'issue_type': 'garbage', 'ai_class': 'garbage', 'confidence': 0.41}
+        ],
+        'all_detections': detections,
+        'message': 'Classification successful'
+    }
+
+
+def default_path(result: dict) -> bytes:
+    """What FastAPI does for response_model=ClassificationResponse"""
+    model = ClassificationResponse(**result)
+    validated = ClassificationResponse.model_validate(model.model_dump())
+    return json.dumps(
+        jsonable_encoder(validated),
+        ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode('utf-8')
+
+
+def fast_path(result: dict, **shape) -> bytes:
+    payload = shape_classification(result, **shape)
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode('utf-8')
+
+
+def bench(label: str, fn, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed / iterations * 1e6:9.1f} us/response  {len(body):7d} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--detections', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    result = make_result(args.detections)
+    print(f"{args.detections} detections, {args.iterations} iterations, orjson={'yes' if orjson else 'no'}")
+
+    bench("response_model + json", lambda: default_path(result), args.iterations)
+    bench("fast path (full)", lambda: fast_path(result), args.iterations)
+    bench("fast path (max_detections=5)", lambda: fast_path(result, max_detections=5), args.iterations)
+    bench("fast path (detail=summary)", lambda: fast_path(result, detail='summary'), args.iterations)
+    bench(
+        "fast path (fields=issue_type,...)",
+        lambda: fast_path(result, fields='issue_type,confidence,alternative_classes'),
+        args.iterations
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Redis Streams Job Queue Check
+Runs the queued classification path against a local Redis: enqueue,
+consume, reclaim after a crashed consumer and dead-letter
+
+Uses throwaway stream names (deleted afterwards) and a stand-in model that
+fails on images named "bad", so it needs Redis but not YOLOv8 weights.
+
+Usage:
+    redis-server --daemonize yes
+    python -m benchmarks.check_stream_queue [--redis-url redis://localhost:6379/0]
+"""
+
+import os
+import sys
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+
+import redis
+
+from src.config import config
+from src.classifier import ClassificationService
+from src.stream_worker import ClassificationJobQueue, StreamWorker
+
+
+class StandInModel:
+    """predict_batch that finds a pothole in every image except "bad" ones"""
+
+    def predict_batch(self, images):
+        if any('bad' in os.path.basename(image) for image in images):
+            raise ValueError("cannot decode image")
+        return [[{'class_name': 'pothole', 'confidence': 0.9, 'bbox': [0, 0, 10, 10]}] for _ in images]
+
+
+class NoCache:
+    """Keeps the check away from the real result cache"""
+
+    def get(self, **kwargs):
+        return None
+
+    def set(self, *args, **kwargs):
+        pass
+
+
+def check(label: str, ok: bool) -> bool:
+    print(f"{'PASS' if ok else 'FAIL'}  {label}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--redis-url', default='redis://localhost:6379/0')
+    args = parser.parse_args()
+
+    client = redis.Redis.from_url(args.redis_url, decode_responses=True)
+    client.ping()
+
+    prefix = f"civic:classify:check:{uuid.uuid4().hex[:8]}"
+    config.STREAM_NAME = f"{prefix}:jobs"
+    config.STREAM_DEAD_LETTER = f"{prefix}:dead"
+    config.STREAM_RESULT_PREFIX = f"{prefix}:result:"
+    config.STREAM_BLOCK_MS = 100
+    config.STREAM_CLAIM_IDLE_MS = 50
+    config.STREAM_MAX_RETRIES = 2
+
+    images = tempfile.mkdtemp()
+    paths = {}
+    for name in ('a', 'b', 'bad', 'c'):
+        paths[name] = os.path.join(images, f"{name}.jpg")
+        with open(paths[name], 'wb') as f:
+            f.write(b'stand-in image')
+
+    def worker(name):
+        return StreamWorker(name, client, StandInModel(), ClassificationService(), NoCache())
+
+    queue = ClassificationJobQueue(client)
+    results = []
+    jobs = {}
+    try:
+        # Enqueue + consume: one batch, the bad image fails on its own
+        jobs = {name: queue.enqueue(image_path=paths[name]) for name in ('a', 'b', 'bad')}
+        completed = worker('check-a').run_once()
+        results.append(check("batch of 3 completes the 2 good jobs", completed == 2))
+        results.append(check("bad job stays pending",
+                             client.xpending(queue.stream, queue.group)['pending'] == 1))
+        done = queue.get_result(jobs['a']['job_id'])
+        results.append(check("result stored for a good job",
+                             done is not None and done['status'] == 'done'))
+
+        # Reclaim: check-b reads a job and crashes before acknowledging it
+        jobs['c'] = queue.enqueue(image_path=paths['c'])
+        worker('check-b')._read()
+        time.sleep(config.STREAM_CLAIM_IDLE_MS / 1000 * 2)
+        worker('check-a').run_once()
+        reclaimed = queue.get_result(jobs['c']['job_id'])
+        results.append(check("crashed consumer's job reclaimed and completed",
+                             reclaimed is not None and reclaimed['status'] == 'done'))
+
+        # Dead-letter: the bad job exceeds STREAM_MAX_RETRIES deliveries
+        for _ in range(config.STREAM_MAX_RETRIES + 1):
+            time.sleep(config.STREAM_CLAIM_IDLE_MS / 1000 * 2)
+            worker('check-a').run_once()
+        failed = queue.get_result(jobs['bad']['job_id'])
+        results.append(check("bad job dead-lettered", client.xlen(queue.dead_letter) == 1))
+        results.append(check("bad job result is failed", failed is not None and failed['status'] == 'failed'))
+        results.append(check("nothing left pending", client.xpending(queue.stream, queue.group)['pending'] == 0))
+    finally:
+        result_keys = [job['result_key'] for job in jobs.values()]
+        client.delete(queue.stream, queue.dead_letter, *result_keys)
+        shutil.rmtree(images, ignore_errors=True)
+
+    print(f"{sum(results)}/{len(results)} checks passed")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,38 @@
-from flask import Flask, render_template, request, jsonify
-from inference_sdk import InferenceHTTPClient
-import cv2
+from flask import Flask, render_template, request, jsonify, send_file, Response
+from werkzeug.utils import secure_filename
 import os
+import math
 import uuid
-import json
 import base64
 import time
 from PIL import Image
 from datetime import datetime
-import sqlite3
 import random
 
-app = Flask(__name__)
+from detection import run_detection, run_detection_batch, all_models_failed
+from detectors import DetectorRouter, Frame, encode_jpeg
+from detection_cache import CachedDetector, create_persistent_tier
+from circuit_breaker import BreakerDetector
+from results import ResultImages
+from jobs import JobQueue, QueueFull
+from novelty import NoveltyFilter, fingerprint
+from tracking import IssueTracker
+from video import sample_keyframes, video_info
+from survey_runs import (parse_track, parse_position, parse_time, frame_times_for, interpolate_positions,
+                         ROBOT_MAX_RUN_FRAMES, ROBOT_RUN_WORKERS, ROBOT_RUN_QUEUE_SIZE)
+from heatmap import heatmap_cells, parse_bbox, HEATMAP_DEFAULT_ZOOM
+from hotspots import HotspotIndex, find_nearby, list_hotspots, HOTSPOT_RADIUS_M
+from tiles import TileCache, valid_tile
+from simulation import (find_images, run_ordered, format_event, SIMULATE_DIR, SIMULATE_WORKERS,
+                        SIMULATE_MAX_WORKERS, SIMULATE_BATCH_SIZE)
+from storage import (init_db, get_connection, make_survey, detection_rows, survey_writer, add_insert_listener,
+                     insert_surveys, get_totals, get_severity_counts, rebuild_aggregates,
+                     backfill_detections, query_detections, get_detection_counts)
 
-CLIENT = InferenceHTTPClient(
-    api_url="https://serverless.roboflow.com",
-    api_key="wDn97RYRazmoOEE8okiH"
-)
+app = Flask(__name__)
 
 UPLOAD_DIR = "static/uploads"
-RESULTS_DIR = "static/results"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(RESULTS_DIR, exist_ok=True)
 
 MODELS = {
     "potholes": {"id": "pothole-clzln/1", "name": "Potholes", "color": (0, 0, 255)},
@@ -34,20 +45,27 @@ MODELS = {
     "visual_pollution": {"id": "visual-pollution-3/1", "name": "Visual Pollution", "color": (128, 0, 128)}
 }
 
-def init_db():
-    conn = sqlite3.connect('road_survey.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS surveys
-                 (id INTEGER PRIMARY KEY, timestamp TEXT, latitude REAL, longitude REAL,
-                  potholes INTEGER, garbage INTEGER, manholes INTEGER, damaged_roads INTEGER,
-                  construction_debris INTEGER, stray_animals INTEGER, water_leakage INTEGER,
-                  visual_pollution INTEGER, total_issues INTEGER, severity_score REAL,
-                  description TEXT, report_type TEXT, source TEXT)''')
-    conn.commit()
-    conn.close()
+# Hosted Roboflow API or local YOLOv8, per model (see detectors.py), guarded
+# by per-model circuit breakers (see circuit_breaker.py) and behind a
+# content-addressed result cache (see detection_cache.py)
+BREAKERS = BreakerDetector(DetectorRouter(MODELS))
+CLIENT = CachedDetector(BREAKERS, persistent=create_persistent_tier())
 
 init_db()
 
+# Result images are rendered when first viewed, not on every detection
+RESULTS = ResultImages({key: model["color"] for key, model in MODELS.items()})
+RESULTS.init_db()
+
+# Heatmap tiles are cached on disk; new surveys drop only the tiles they touch
+TILES = TileCache()
+add_insert_listener(TILES.invalidate_surveys)
+
+# Nearby surveys of the same issue type are merged into hotspots
+HOTSPOTS = HotspotIndex()
+HOTSPOTS.init_db()
+add_insert_listener(HOTSPOTS.merge_surveys)
+
 @app.route("/")
 def index():
     return render_template("index.html", models=MODELS)
@@ -60,6 +78,86 @@ def admin_dashboard():
 def robot_interface():
     return render_template("robot.html")
 
+# Near-identical consecutive frames of a robot reuse the last result
+NOVELTY = NoveltyFilter()
+
+# An issue seen in consecutive frames is counted once (see tracking.py)
+TRACKER = IssueTracker()
+
+def track_issues(robot_id, predictions, latitude, longitude):
+    """
+    (new_count, new, continued, detections) for one frame's visual pollution
+    predictions; detections (storage.detection_rows) are those of the new
+    issues. Without tracking every detection is new.
+    """
+    if not TRACKER.enabled:
+        return len(predictions), [], [], detection_rows(predictions, "visual_pollution")
+    new, continued, track_ids = TRACKER.update(robot_id, predictions, latitude, longitude)
+    new_ids = {issue["track_id"] for issue in new}
+    detections = [detection for detection in detection_rows(predictions, "visual_pollution", track_ids)
+                  if detection["track_id"] in new_ids]
+    return len(new), new, continued, detections
+
+def process_robot_frame(image_bytes, latitude, longitude, robot_id):
+    """Store a robot frame, detect visual pollution and record the survey"""
+    frame = fingerprint(image_bytes) if NOVELTY.enabled else None
+    previous = NOVELTY.check(robot_id, frame, latitude, longitude)
+    if previous is not None:
+        # Same view from the same spot: no inference and no duplicate survey
+        if not TRACKER.enabled:
+            return dict(previous, skipped=True, survey_stored=False)
+        # ...and with tracking, its issues are the ones already tracked
+        return dict(previous, skipped=True, survey_stored=False, total_issues=0,
+                    issue_counts={key: 0 for key in MODELS.keys()}, new_tracks=[],
+                    continued_tracks=previous["new_tracks"] + previous["continued_tracks"])
+    
+    # robot_id comes from the client (JSON or headers), keep it out of the path
+    filename = f"robot_{secure_filename(str(robot_id)) or 'unknown'}_{uuid.uuid4()}.jpg"
+    image_path = os.path.join(UPLOAD_DIR, filename)
+    
+    with open(image_path, 'wb') as f:
+        f.write(image_bytes)
+    
+    # Only use visual pollution model for robot
+    issue_counts = {key: 0 for key in MODELS.keys()}
+    detection_error = None
+    new_tracks, continued_tracks, detections = [], [], []
+    
+    try:
+        result = CLIENT.infer(image_bytes, model_id="visual-pollution-3/1")
+        issue_counts['visual_pollution'], new_tracks, continued_tracks, detections = track_issues(
+            robot_id, result["predictions"], latitude, longitude)
+    except Exception as e:
+        detection_error = str(e)
+    
+    # With tracking, only frames showing a new issue become surveys
+    survey_stored = not TRACKER.enabled or bool(new_tracks)
+    # Track ids are stored with the detections; the description stays readable
+    classes = sorted({detection["class"] for detection in detections})
+    survey = make_survey(latitude, longitude, issue_counts,
+                         description=f"Robot {robot_id} scan: {', '.join(classes)}" if classes else '',
+                         report_type='robot_survey', source='robot', detections=detections)
+    if survey_stored:
+        survey_writer.submit(survey)
+    
+    result = {
+        "success": True,
+        "total_issues": survey["total_issues"],
+        "issue_counts": issue_counts,
+        "new_tracks": new_tracks,
+        "continued_tracks": continued_tracks,
+        "survey_stored": survey_stored,
+        "detection_error": detection_error,
+        "skipped": False
+    }
+    NOVELTY.remember(robot_id, frame, latitude, longitude, None if detection_error else result)
+    return result
+
+# Robot frames are processed by background workers (see jobs.py). A robot's
+# frames always go to the same worker, so the novelty filter and the tracker
+# see them in the order they were sent
+ROBOT_JOBS = JobQueue(process_robot_frame, partition="robot_id").start()
+
 @app.route("/robot/submit", methods=["POST"])
 def robot_submit():
     try:
@@ -69,87 +167,445 @@ def robot_submit():
         longitude = data.get('longitude')
         robot_id = data.get('robot_id', 'unknown')
         
-        image_bytes = base64.b64decode(image_data)
-        filename = f"robot_{robot_id}_{uuid.uuid4()}.jpg"
-        image_path = os.path.join(UPLOAD_DIR, filename)
+        if not image_data or latitude is None or longitude is None:
+            return jsonify({"error": "Missing image, latitude or longitude"}), 400
         
-        with open(image_path, 'wb') as f:
-            f.write(image_bytes)
+        try:
+            image_bytes = base64.b64decode(image_data)
+        except ValueError:
+            return jsonify({"error": "Invalid base64 image"}), 400
         
-        # Only use visual pollution model for robot
-        issue_counts = {key: 0 for key in MODELS.keys()}
-        total_issues = 0
-        severity_score = 0
+        return enqueue_robot_frame(image_bytes, float(latitude), float(longitude), robot_id)
         
-        try:
-            result = CLIENT.infer(image_path, model_id="visual-pollution-3/1")
-            count = len(result["predictions"])
-            issue_counts['visual_pollution'] = count
-            total_issues = count
-            severity_score = count * 1.0
-        except:
-            pass
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+ROBOT_MAX_FRAME_BYTES = int(os.getenv('ROBOT_MAX_FRAME_BYTES', 16 * 1024 * 1024))
+
+@app.route("/robot/frames", methods=["POST"])
+def robot_frames():
+    """
+    Binary frame upload: the raw image as request body with X-Robot-Id,
+    X-Latitude and X-Longitude headers, or multipart with an "image" file and
+    robot_id/latitude/longitude form fields. Same queue as /robot/submit.
+    """
+    if request.content_length and request.content_length > ROBOT_MAX_FRAME_BYTES:
+        return jsonify({"error": "Frame too large"}), 413
+    
+    if request.mimetype == 'multipart/form-data':
+        file = request.files.get('image')
+        image_bytes = file.read(ROBOT_MAX_FRAME_BYTES + 1) if file else b''
+        fields = request.form
+        latitude = fields.get('latitude')
+        longitude = fields.get('longitude')
+        robot_id = fields.get('robot_id', 'unknown')
+    else:
+        # Read straight from the input stream, no JSON or base64 round trip
+        image_bytes = request.stream.read(ROBOT_MAX_FRAME_BYTES + 1)
+        latitude = request.headers.get('X-Latitude', request.args.get('latitude'))
+        longitude = request.headers.get('X-Longitude', request.args.get('longitude'))
+        robot_id = request.headers.get('X-Robot-Id', request.args.get('robot_id', 'unknown'))
+    
+    if len(image_bytes) > ROBOT_MAX_FRAME_BYTES:
+        return jsonify({"error": "Frame too large"}), 413
+    if not image_bytes or latitude is None or longitude is None:
+        return jsonify({"error": "Missing image, latitude or longitude"}), 400
+    
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except ValueError:
+        return jsonify({"error": "Invalid latitude or longitude"}), 400
+    
+    return enqueue_robot_frame(image_bytes, latitude, longitude, robot_id)
+
+def enqueue_robot_frame(image_bytes, latitude, longitude, robot_id):
+    """202 with the job id, or 503 + Retry-After when the queue is full"""
+    try:
+        job_id = ROBOT_JOBS.submit(image_bytes=image_bytes, latitude=latitude,
+                                   longitude=longitude, robot_id=robot_id)
+    except QueueFull as e:
+        response = jsonify({"error": "Robot job queue is full", "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 503
+    
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/robot/jobs/{job_id}",
+        "queue_depth": ROBOT_JOBS.queued()
+    }), 202
+
+def process_survey_run(frames, track, frame_times, robot_id, model_keys):
+    """
+    Detect on a run's frames as one batch, store each checked frame with its
+    result image record and insert every survey in a single transaction,
+    positioned from the GPS track
+    """
+    latitudes, longitudes = interpolate_positions(track, frame_times)
+    safe_id = secure_filename(str(robot_id)) or 'unknown'
+    run_id = uuid.uuid4().hex[:12]
+    
+    detections = run_detection_batch(CLIENT, frames, MODELS, model_keys)
+    
+    rows = []
+    renders = []
+    results = []
+    for index, (predictions, issue_counts, errors) in enumerate(detections):
+        if all_models_failed(errors, MODELS, model_keys):
+            # Nothing was checked: an all-zero survey would look like a clean road
+            results.append({"index": index, "survey_id": None, "errors": errors})
+            continue
         
-        conn = sqlite3.connect('road_survey.db')
-        c = conn.cursor()
-        c.execute('''INSERT INTO surveys VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                 (datetime.now().isoformat(), latitude, longitude,
-                  0, 0, 0, 0, 0, 0, 0,  # All other issues set to 0
-                  issue_counts['visual_pollution'], total_issues, severity_score,
-                  '', 'robot_survey', 'robot'))
-        conn.commit()
-        conn.close()
+        # Kept on disk only as the source of the survey's result image
+        name = f"run_{safe_id}_{run_id}_{index}.jpg"
+        image_path = os.path.join(UPLOAD_DIR, name)
+        with open(image_path, 'wb') as f:
+            f.write(frames[index])
+        renders.append((f"result_{name}", image_path, predictions))
         
-        return jsonify({
-            "success": True, 
-            "total_issues": total_issues,
-            "issue_counts": issue_counts
+        survey = make_survey(float(latitudes[index]), float(longitudes[index]), issue_counts,
+                             description=f'Robot {robot_id} run frame {index}',
+                             report_type='robot_survey_run', source='robot',
+                             timestamp=datetime.fromtimestamp(frame_times[index]).isoformat(),
+                             result_image=f"result_{name}", detections=detection_rows(predictions))
+        rows.append(survey)
+        results.append({
+            "index": index,
+            "latitude": survey["latitude"],
+            "longitude": survey["longitude"],
+            "total_issues": survey["total_issues"],
+            "issue_counts": issue_counts,
+            "result_image": f"/results/result_{name}",
+            "errors": errors
         })
+    
+    # One transaction for the render records and one for the whole run
+    RESULTS.record_many(renders)
+    survey_ids = iter(insert_surveys(rows))
+    for result in results:
+        if "survey_id" not in result:
+            result["survey_id"] = next(survey_ids)
+    
+    return {
+        "success": True,
+        "frames": len(frames),
+        "surveys_stored": len(rows),
+        "total_issues": sum(row["total_issues"] for row in rows),
+        "failed_frames": sum(1 for result in results if result["errors"]),
+        "results": results
+    }
+
+SURVEY_RUNS = JobQueue(process_survey_run, workers=ROBOT_RUN_WORKERS,
+                       max_queued=ROBOT_RUN_QUEUE_SIZE, name="survey-run").start()
+
+@app.route("/robot/survey-run", methods=["POST"])
+def robot_survey_run():
+    """
+    multipart/form-data: "frames" files in capture order, "track" (JSON GPS
+    track, see survey_runs.parse_track), optional "frame_times" (JSON list of
+    Unix times, one per frame), "robot_id" and "model" (a MODELS key or
+    all_detect, default visual_pollution)
+    """
+    frames = [file.read() for file in request.files.getlist('frames')]
+    robot_id = request.form.get('robot_id', 'unknown')
+    model_key = request.form.get('model', 'visual_pollution')
+    
+    if not frames:
+        return jsonify({"error": "No frames"}), 400
+    if len(frames) > ROBOT_MAX_RUN_FRAMES:
+        return jsonify({"error": f"At most {ROBOT_MAX_RUN_FRAMES} frames per run"}), 413
+    if model_key not in MODELS and model_key != "all_detect":
+        return jsonify({"error": "Invalid model"}), 400
+    
+    try:
+        track = parse_track(request.form.get('track', ''))
+        frame_times = frame_times_for(len(frames), track[0], request.form.get('frame_times'))
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"error": f"Invalid track or frame_times: {e}"}), 400
+    
+    model_keys = list(MODELS.keys()) if model_key == "all_detect" else [model_key]
+    try:
+        job_id = SURVEY_RUNS.submit(frames=frames, track=track, frame_times=frame_times,
+                                    robot_id=robot_id, model_keys=model_keys)
+    except QueueFull as e:
+        response = jsonify({"error": "Survey run queue is full", "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 503
+    
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/robot/jobs/{job_id}",
+        "frames": len(frames)
+    }), 202
+
+VIDEO_DIR = "static/videos"
+VIDEO_BATCH_SIZE = int(os.getenv('VIDEO_BATCH_SIZE', 16))
+ROBOT_MAX_VIDEO_MB = int(os.getenv('ROBOT_MAX_VIDEO_MB', 500))
+os.makedirs(VIDEO_DIR, exist_ok=True)
+
+def process_video(video_path, robot_id, model_keys, track=None, start_time=None,
+                  latitude=None, longitude=None):
+    """
+    Sample keyframes from a stored video, detect in batches of
+    VIDEO_BATCH_SIZE and store one survey per keyframe, geotagged from the
+    GPS track (at start_time + video time) or the fixed position
+    """
+    safe_id = secure_filename(str(robot_id)) or 'unknown'
+    video_id = uuid.uuid4().hex[:12]
+    start_time = start_time if start_time is not None else time.time()
+    results = []
+    
+    def flush(batch):
+        images = [image for _, _, _, image in batch]
+        detections = run_detection_batch(CLIENT, images, MODELS, model_keys)
         
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        rows = []
+        for (index, seconds, reason, image), (predictions, issue_counts, errors) in zip(batch, detections):
+            if all_models_failed(errors, MODELS, model_keys):
+                # Nothing was checked: no all-zero survey and no result image
+                results.append({"frame": index, "time": round(seconds, 2), "reason": reason,
+                                "result_image": None, "errors": errors})
+                continue
+            
+            name = f"video_{safe_id}_{video_id}_{index}.jpg"
+            image_path = os.path.join(UPLOAD_DIR, name)
+            with open(image_path, 'wb') as f:
+                f.write(image)
+            RESULTS.record(f"result_{name}", image_path, predictions)
+            
+            if track is not None:
+                lat, lng = interpolate_positions(track, [start_time + seconds])
+                lat, lng = float(lat[0]), float(lng[0])
+            else:
+                lat, lng = latitude, longitude
+            
+            rows.append(make_survey(lat, lng, issue_counts,
+                                    description=f'Robot {robot_id} video frame {index} ({reason})',
+                                    report_type='robot_video', source='robot',
+                                    timestamp=datetime.fromtimestamp(start_time + seconds).isoformat(),
+                                    result_image=f"result_{name}", detections=detection_rows(predictions)))
+            results.append({
+                "frame": index,
+                "time": round(seconds, 2),
+                "reason": reason,
+                "latitude": lat,
+                "longitude": lng,
+                "total_issues": rows[-1]["total_issues"],
+                "issue_counts": issue_counts,
+                "result_image": f"/results/result_{name}",
+                "errors": errors
+            })
+        
+        insert_surveys(rows)
+    
+    try:
+        info = video_info(video_path)
+        batch = []
+        # Keyframes are encoded as soon as they are sampled, so only one
+        # decoded frame is alive at a time
+        for index, seconds, frame, reason in sample_keyframes(video_path):
+            batch.append((index, seconds, reason, encode_jpeg(frame)))
+            if len(batch) >= VIDEO_BATCH_SIZE:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        os.remove(video_path)
+    
+    return {
+        "success": True,
+        "video": info,
+        "keyframes": len(results),
+        "surveys_stored": sum(1 for result in results if result["result_image"]),
+        "total_issues": sum(result.get("total_issues", 0) for result in results),
+        "results": results
+    }
+
+VIDEO_JOBS = JobQueue(process_video, workers=int(os.getenv('VIDEO_WORKERS', 1)),
+                      max_queued=int(os.getenv('VIDEO_QUEUE_SIZE', 4)), name="video").start()
+
+@app.route("/robot/video", methods=["POST"])
+def robot_video():
+    """
+    multipart/form-data: "video" file, "robot_id", "model" (default
+    visual_pollution, or all_detect) and either a GPS "track" (see
+    survey_runs.parse_track) with the video's "start_time" (Unix seconds) or
+    a fixed "latitude"/"longitude"
+    """
+    if request.content_length and request.content_length > ROBOT_MAX_VIDEO_MB * 1024 * 1024:
+        return jsonify({"error": "Video too large"}), 413
+    
+    file = request.files.get('video')
+    robot_id = request.form.get('robot_id', 'unknown')
+    model_key = request.form.get('model', 'visual_pollution')
+    if file is None or file.filename == "":
+        return jsonify({"error": "Missing video"}), 400
+    if model_key not in MODELS and model_key != "all_detect":
+        return jsonify({"error": "Invalid model"}), 400
+    
+    position = {}
+    try:
+        if request.form.get('track'):
+            position["track"] = parse_track(request.form['track'])
+            position["start_time"] = parse_time(request.form.get('start_time', position["track"][0][0]))
+        elif request.form.get('latitude') and request.form.get('longitude'):
+            position["latitude"], position["longitude"] = parse_position(request.form['latitude'],
+                                                                         request.form['longitude'])
+        else:
+            return jsonify({"error": "Missing GPS track or latitude/longitude"}), 400
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"error": f"Invalid track or position: {e}"}), 400
+    
+    # Streamed to disk in chunks; VideoCapture reads it from there
+    extension = os.path.splitext(secure_filename(file.filename))[1] or '.mp4'
+    video_path = os.path.join(VIDEO_DIR, f"{uuid.uuid4()}{extension}")
+    file.save(video_path)
+    
+    model_keys = list(MODELS.keys()) if model_key == "all_detect" else [model_key]
+    try:
+        job_id = VIDEO_JOBS.submit(video_path=video_path, robot_id=robot_id,
+                                   model_keys=model_keys, **position)
+    except QueueFull as e:
+        os.remove(video_path)
+        response = jsonify({"error": "Video queue is full", "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 503
+    
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/robot/jobs/{job_id}"
+    }), 202
+
+@app.route("/robot/jobs/<job_id>")
+def get_robot_job(job_id):
+    job = ROBOT_JOBS.get(job_id) or SURVEY_RUNS.get(job_id) or VIDEO_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route("/api/robot-novelty/stats")
+def get_robot_novelty_stats():
+    return jsonify(NOVELTY.get_stats())
+
+@app.route("/api/robot-tracking/stats")
+def get_robot_tracking_stats():
+    return jsonify(TRACKER.get_stats())
+
+@app.route("/api/robot-jobs/stats")
+def get_robot_job_stats():
+    return jsonify({**ROBOT_JOBS.get_stats(), "survey_runs": SURVEY_RUNS.get_stats(),
+                    "videos": VIDEO_JOBS.get_stats()})
 
 @app.route("/api/heatmap")
 def get_heatmap_data():
-    conn = sqlite3.connect('road_survey.db')
-    c = conn.cursor()
-    c.execute('SELECT latitude, longitude, total_issues, severity_score FROM surveys')
-    data = c.fetchall()
-    conn.close()
-    
-    heatmap_data = []
-    for row in data:
-        lat, lng, issues, severity = row
-        heatmap_data.append({
-            "lat": lat,
-            "lng": lng,
-            "intensity": min(severity / 10, 1.0)
-        })
+    # ?bbox=minLng,minLat,maxLng,maxLat&zoom=12 -> grid cells for that viewport
+    try:
+        bbox = parse_bbox(request.args.get('bbox', ''))
+        zoom = int(request.args.get('zoom', HEATMAP_DEFAULT_ZOOM))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid bbox or zoom: {e}"}), 400
     
-    return jsonify(heatmap_data)
+    with get_connection() as conn:
+        return jsonify(heatmap_cells(conn, bbox, zoom))
+
+@app.route("/api/hotspots")
+def get_hotspots():
+    # ?bbox=minLng,minLat,maxLng,maxLat&type=potholes&min_surveys=2&limit=500
+    try:
+        bbox = parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+        min_surveys = int(request.args.get('min_surveys', 1))
+        limit = min(int(request.args.get('limit', 500)), 5000)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    
+    with get_connection() as conn:
+        hotspots = list_hotspots(conn, bbox, request.args.get('type'), min_surveys, limit)
+    return jsonify({"hotspots": hotspots})
+
+@app.route("/api/hotspots/nearby")
+def get_nearby_hotspots():
+    # ?lat=..&lng=..&radius=25&type=potholes -> hotspots within radius metres
+    if 'lat' not in request.args or 'lng' not in request.args:
+        return jsonify({"error": "lat and lng are required"}), 400
+    try:
+        latitude, longitude = parse_position(request.args['lat'], request.args['lng'])
+        radius = float(request.args.get('radius', HOTSPOT_RADIUS_M))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid lat, lng or radius: {e}"}), 400
+    if not math.isfinite(radius) or radius < 0:
+        return jsonify({"error": "radius must be a non-negative number"}), 400
+    
+    issue_type = request.args.get('type')
+    with get_connection() as conn:
+        hotspots = find_nearby(conn, latitude, longitude, radius, [issue_type] if issue_type else None)
+    return jsonify({"exists": bool(hotspots), "hotspots": hotspots})
+
+@app.route("/api/hotspots/stats")
+def get_hotspot_stats():
+    with get_connection() as conn:
+        return jsonify(HOTSPOTS.get_stats(conn))
+
+@app.route("/api/detections")
+def get_detections():
+    # ?class=manhole&model=manholes&min_confidence=0.8&bbox=minLng,minLat,maxLng,maxLat&since=&limit=
+    try:
+        bbox = parse_bbox(request.args['bbox']) if request.args.get('bbox') else None
+        min_confidence = float(request.args['min_confidence']) if request.args.get('min_confidence') else None
+        limit = min(int(request.args.get('limit', 500)), 5000)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    
+    with get_connection() as conn:
+        detections = query_detections(conn, request.args.get('class'), request.args.get('model'),
+                                      min_confidence, bbox, request.args.get('since'), limit)
+    return jsonify({"count": len(detections), "detections": detections})
+
+@app.route("/api/detections/stats")
+def get_detection_stats():
+    with get_connection() as conn:
+        counts = get_detection_counts(conn)
+    return jsonify({"classes": [{
+        "model": model_key,
+        "class": cls,
+        "count": count,
+        "avg_confidence": round(avg_confidence, 3) if avg_confidence is not None else None
+    } for model_key, cls, count, avg_confidence in counts]})
+
+@app.route("/api/heatmap/tiles/<int:z>/<int:x>/<int:y>.png")
+def get_heatmap_tile(z, x, y):
+    if not valid_tile(z, x, y):
+        return jsonify({"error": "Invalid tile"}), 404
+    
+    with get_connection() as conn:
+        path, data = TILES.get(conn, z, x, y)
+    
+    if path:
+        # ETag + conditional requests: unchanged tiles are a 304
+        return send_file(path, mimetype="image/png", conditional=True, etag=True, max_age=0)
+    return Response(data, mimetype="image/png", headers={"Cache-Control": "no-store"})
+
+@app.route("/api/heatmap/tiles/stats")
+def get_heatmap_tile_stats():
+    return jsonify(TILES.get_stats())
 
 @app.route("/api/stats")
 def get_stats():
-    conn = sqlite3.connect('road_survey.db')
-    c = conn.cursor()
-    c.execute('''SELECT 
-                    COUNT(*) as total_surveys,
-                    SUM(potholes) as total_potholes,
-                    SUM(garbage) as total_garbage,
-                    SUM(manholes) as total_manholes,
-                    SUM(damaged_roads) as total_damaged_roads,
-                    AVG(severity_score) as avg_severity
-                 FROM surveys''')
-    stats = c.fetchone()
-    conn.close()
+    with get_connection() as conn:
+        totals = get_totals(conn)
     
     return jsonify({
-        "total_surveys": stats[0],
-        "total_potholes": stats[1],
-        "total_garbage": stats[2],
-        "total_manholes": stats[3],
-        "total_damaged_roads": stats[4],
-        "avg_severity": round(stats[5] or 0, 2)
+        "total_surveys": totals["surveys"],
+        "total_potholes": totals["potholes"],
+        "total_garbage": totals["garbage"],
+        "total_manholes": totals["manholes"],
+        "total_damaged_roads": totals["damaged_roads"],
+        "avg_severity": round(totals["avg_severity"], 2)
     })
 
 @app.route("/detect", methods=["POST"])
@@ -164,85 +620,44 @@ def detect():
     description = request.form.get('description', '')
     report_type = request.form.get('reportType', model_key)
     
-    if file.filename == "" or model_key not in MODELS:
+    if file.filename == "" or (model_key not in MODELS and model_key != "all_detect"):
         return jsonify({"error": "Invalid file or model"}), 400
     
+    try:
+        # Decoded once; JPEG uploads are stored and sent to the API as uploaded
+        frame = Frame(file.read())
+    except ValueError:
+        return jsonify({"error": "Could not decode image"}), 400
+    
     try:
         filename = f"{uuid.uuid4()}.jpg"
         image_path = os.path.join(UPLOAD_DIR, filename)
+        frame.save(image_path)
         
-        img = Image.open(file)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            img = img.convert('RGB')
-        img.save(image_path, 'JPEG', quality=95)
-        
-        image = cv2.imread(image_path)
-        all_predictions = []
-        issue_counts = {key: 0 for key in MODELS.keys()}
-        
-        if model_key == "all_detect":
-            for key, model in MODELS.items():
-                try:
-                    result = CLIENT.infer(image_path, model_id=model["id"])
-                    for pred in result["predictions"]:
-                        pred["model_type"] = key
-                        all_predictions.append(pred)
-                    issue_counts[key] = len(result["predictions"])
-                except:
-                    continue
-        else:
-            model_id = MODELS[model_key]["id"]
-            result = CLIENT.infer(image_path, model_id=model_id)
-            for pred in result["predictions"]:
-                pred["model_type"] = model_key
-                all_predictions.append(pred)
-            issue_counts[model_key] = len(result["predictions"])
-        
-        for pred in all_predictions:
-            x = int(pred["x"] - pred["width"] / 2)
-            y = int(pred["y"] - pred["height"] / 2)
-            w = int(pred["width"])
-            h = int(pred["height"])
-            conf = pred["confidence"]
-            class_name = pred["class"]
-            model_color = MODELS[pred["model_type"]]["color"]
-            
-            overlay = image.copy()
-            cv2.rectangle(overlay, (x, y), (x + w, y + h), model_color, -1)
-            cv2.addWeighted(overlay, 0.2, image, 0.8, 0, image)
-            cv2.rectangle(image, (x, y), (x + w, y + h), model_color, 2)
-            
-            label = f"{class_name} {conf:.2f}"
-            (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-            cv2.rectangle(image, (x, y - label_h - 10), (x + label_w + 10, y), (255, 255, 255), -1)
-            cv2.rectangle(image, (x, y - label_h - 10), (x + label_w + 10, y), model_color, 2)
-            cv2.putText(image, label, (x + 5, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+        # One concurrent call per distinct model id
+        model_keys = list(MODELS.keys()) if model_key == "all_detect" else [model_key]
+        all_predictions, issue_counts, errors = run_detection(CLIENT, frame, MODELS, model_keys)
+        if errors and model_key != "all_detect":
+            return jsonify({"error": next(iter(errors.values())), "errors": errors}), 500
+        if all_models_failed(errors, MODELS, model_keys):
+            # Every model failed: all-zero counts would look like a clean road
+            return jsonify({"error": "All detection models failed", "errors": errors}), 502
         
         result_filename = f"result_{filename}"
-        result_path = os.path.join(RESULTS_DIR, result_filename)
-        cv2.imwrite(result_path, image)
+        result_image = RESULTS.record(result_filename, image_path, all_predictions)
         
         if latitude and longitude:
-            total_issues = sum(issue_counts.values())
-            severity_score = sum(count * (1.5 if key in ['potholes', 'damaged_roads'] else 1.0) for key, count in issue_counts.items())
-            
-            conn = sqlite3.connect('road_survey.db')
-            c = conn.cursor()
-            c.execute('''INSERT INTO surveys VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                     (datetime.now().isoformat(), float(latitude), float(longitude),
-                      issue_counts['potholes'], issue_counts['garbage'], issue_counts['manholes'],
-                      issue_counts['damaged_roads'], issue_counts['construction_debris'],
-                      issue_counts['stray_animals'], issue_counts['water_leakage'],
-                      issue_counts['visual_pollution'], total_issues, severity_score,
-                      description, report_type, 'manual_survey'))
-            conn.commit()
-            conn.close()
+            survey_writer.submit(make_survey(float(latitude), float(longitude), issue_counts,
+                                             description=description, report_type=report_type,
+                                             source='manual_survey', result_image=result_filename,
+                                             detections=detection_rows(all_predictions)))
         
         return jsonify({
             "success": True,
-            "result_image": f"/static/results/{result_filename}",
+            "result_image": result_image,
             "detections": len(all_predictions),
-            "predictions": all_predictions
+            "predictions": all_predictions,
+            "errors": errors
         })
         
     except Exception as e:
@@ -287,51 +702,29 @@ def save_test_image():
 
 @app.route("/api/detailed-stats")
 def get_detailed_stats():
-    conn = sqlite3.connect('road_survey.db')
-    c = conn.cursor()
-    
-    c.execute('''SELECT 
-                    COUNT(*) as total_surveys,
-                    SUM(potholes) as total_potholes,
-                    SUM(garbage) as total_garbage,
-                    SUM(manholes) as total_manholes,
-                    SUM(damaged_roads) as total_damaged_roads,
-                    SUM(construction_debris) as total_construction_debris,
-                    SUM(stray_animals) as total_stray_animals,
-                    SUM(water_leakage) as total_water_leakage,
-                    SUM(visual_pollution) as total_visual_pollution,
-                    AVG(severity_score) as avg_severity
-                 FROM surveys''')
-    stats = c.fetchone()
-    
-    c.execute('''SELECT timestamp, latitude, longitude, total_issues, description, report_type 
-                 FROM surveys ORDER BY timestamp DESC LIMIT 10''')
-    recent_surveys = c.fetchall()
+    with get_connection() as conn:
+        return _detailed_stats(conn)
+
+def _detailed_stats(conn):
+    totals = get_totals(conn)
     
-    c.execute('''SELECT 
-                    CASE 
-                        WHEN severity_score <= 2 THEN 'Low'
-                        WHEN severity_score <= 5 THEN 'Medium'
-                        WHEN severity_score <= 10 THEN 'High'
-                        ELSE 'Critical'
-                    END as severity_level,
-                    COUNT(*) as count
-                 FROM surveys GROUP BY severity_level''')
-    severity_dist = c.fetchall()
+    # Served by idx_surveys_timestamp
+    recent_surveys = conn.execute('''SELECT timestamp, latitude, longitude, total_issues, description, report_type 
+                                     FROM surveys ORDER BY timestamp DESC LIMIT 10''').fetchall()
     
-    conn.close()
+    severity_dist = get_severity_counts(conn)
     
     return jsonify({
-        "total_surveys": stats[0] or 0,
-        "total_potholes": stats[1] or 0,
-        "total_garbage": stats[2] or 0,
-        "total_manholes": stats[3] or 0,
-        "total_damaged_roads": stats[4] or 0,
-        "total_construction_debris": stats[5] or 0,
-        "total_stray_animals": stats[6] or 0,
-        "total_water_leakage": stats[7] or 0,
-        "total_visual_pollution": stats[8] or 0,
-        "avg_severity": round(stats[9] or 0, 2),
+        "total_surveys": totals["surveys"],
+        "total_potholes": totals["potholes"],
+        "total_garbage": totals["garbage"],
+        "total_manholes": totals["manholes"],
+        "total_damaged_roads": totals["damaged_roads"],
+        "total_construction_debris": totals["construction_debris"],
+        "total_stray_animals": totals["stray_animals"],
+        "total_water_leakage": totals["water_leakage"],
+        "total_visual_pollution": totals["visual_pollution"],
+        "avg_severity": round(totals["avg_severity"], 2),
         "recent_surveys": [{
             "timestamp": row[0],
             "latitude": row[1],
@@ -346,131 +739,187 @@ def get_detailed_stats():
         } for row in severity_dist]
     })
 
+SIMULATED_ROBOT_ID = "simulator"
+
+def simulate_robot(recursive=False, limit=None, workers=SIMULATE_WORKERS):
+    """
+    Run the robot pipeline over SIMULATE_DIR (see simulation.py). Yields
+    (event, data): "start", "progress" per image, "result" per image once
+    its batch is committed ("image_error" if detection failed), and "done".
+    """
+    image_files = find_images(SIMULATE_DIR, recursive, limit)
+    total = len(image_files)
+    yield "start", {"total": total, "workers": workers, "recursive": recursive}
+    
+    def detect(image_file):
+        return CLIENT.infer(os.path.join(SIMULATE_DIR, image_file), model_id="visual-pollution-3/1")
+    
+    started = time.monotonic()
+    scanned = failed = stored = 0
+    renders, surveys, results = [], [], []
+    
+    def commit():
+        # One transaction for the batch's render records and one for its surveys
+        urls = RESULTS.record_many(renders, style="robot")
+        insert_surveys(surveys)
+        for result, url in zip(results, urls):
+            result["result_image"] = url
+        batch = list(results)
+        renders.clear()
+        surveys.clear()
+        results.clear()
+        return batch
+    
+    for done, (image_file, result, error) in enumerate(run_ordered(detect, image_files, workers), 1):
+        if error is not None:
+            failed += 1
+            print(f"Error processing {image_file}: {error}")
+            yield "image_error", {"image": image_file, "error": str(error)}
+        else:
+            lat = 28.6139 + random.uniform(-0.01, 0.01)
+            lng = 77.2090 + random.uniform(-0.01, 0.01)
+            count, new_tracks, continued_tracks, detections = track_issues(
+                SIMULATED_ROBOT_ID, result["predictions"], lat, lng)
+            
+            # Result image with bounding boxes, rendered when first viewed
+            result_filename = "robot_result_" + image_file.replace(os.sep, "_")
+            renders.append((result_filename, os.path.join(SIMULATE_DIR, image_file), result["predictions"]))
+            if count or not TRACKER.enabled:
+                surveys.append(make_survey(lat, lng, {'visual_pollution': count},
+                                           description=f'Robot scan of {image_file}',
+                                           report_type='robot_simulation', source='robot',
+                                           result_image=result_filename, detections=detections))
+            results.append({
+                "image": image_file,
+                "latitude": lat,
+                "longitude": lng,
+                "visual_pollution_count": count,
+                "detections": len(result["predictions"]),
+                "new_tracks": new_tracks,
+                "continued_tracks": continued_tracks,
+                "classes": [pred["class"] for pred in result["predictions"]]
+            })
+            scanned += 1
+        
+        yield "progress", {"done": done, "total": total, "image": image_file}
+        if len(results) >= SIMULATE_BATCH_SIZE or done == total:
+            stored += len(surveys)
+            for batch_result in commit():
+                yield "result", batch_result
+    
+    elapsed = time.monotonic() - started
+    yield "done", {
+        "total": total,
+        "total_scanned": scanned,
+        "failed": failed,
+        "surveys_stored": stored,
+        "elapsed_seconds": round(elapsed, 3),
+        "images_per_second": round(scanned / elapsed, 2) if elapsed else None
+    }
+
+def simulation_options(options):
+    """(recursive, limit, workers) from request args or JSON"""
+    recursive = str(options.get('recursive', '')).lower() in ('1', 'true', 'yes')
+    limit = int(options['limit']) if options.get('limit') else None
+    workers = min(max(int(options.get('workers', SIMULATE_WORKERS)), 1), SIMULATE_MAX_WORKERS)
+    return recursive, limit, workers
+
+def check_simulation_images():
+    """Error response if there is nothing to simulate, else None"""
+    if not os.path.exists(SIMULATE_DIR):
+        os.makedirs(SIMULATE_DIR)
+        return jsonify({"error": "No test images found. Please add images to test_images folder"}), 400
+    return None
+
 @app.route("/api/robot-simulate", methods=["POST"])
 def robot_simulate():
+    """Whole simulation in one JSON response; {"recursive", "limit", "workers"} optional"""
     try:
-        test_images_dir = "test_images"
-        if not os.path.exists(test_images_dir):
-            os.makedirs(test_images_dir)
-            return jsonify({"error": "No test images found. Please add images to test_images folder"}), 400
-        
-        image_files = [f for f in os.listdir(test_images_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-        if not image_files:
-            return jsonify({"error": "No image files found in test_images folder"}), 400
+        error = check_simulation_images()
+        if error:
+            return error
+        try:
+            recursive, limit, workers = simulation_options(request.get_json(silent=True) or {})
+        except ValueError:
+            return jsonify({"error": "limit and workers must be integers"}), 400
         
         results = []
-        total_scanned = 0
-        
-        for image_file in image_files[:5]:
-            image_path = os.path.join(test_images_dir, image_file)
-            
-            base_lat, base_lng = 28.6139, 77.2090
-            lat = base_lat + (random.uniform(-0.01, 0.01))
-            lng = base_lng + (random.uniform(-0.01, 0.01))
-            
-            try:
-                result = CLIENT.infer(image_path, model_id="visual-pollution-3/1")
-                count = len(result["predictions"])
-                
-                # Generate result image with bounding boxes
-                result_image_path = generate_result_image(image_path, result["predictions"], image_file)
-                
-                conn = sqlite3.connect('road_survey.db')
-                c = conn.cursor()
-                c.execute('''INSERT INTO surveys VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                         (datetime.now().isoformat(), lat, lng,
-                          0, 0, 0, 0, 0, 0, 0, count, count, count * 1.0,
-                          f'Robot scan of {image_file}', 'robot_simulation', 'robot'))
-                conn.commit()
-                conn.close()
-                
-                results.append({
-                    "image": image_file,
-                    "result_image": result_image_path,
-                    "latitude": lat,
-                    "longitude": lng,
-                    "visual_pollution_count": count,
-                    "classes": [pred["class"] for pred in result["predictions"]]
-                })
-                total_scanned += 1
-                
-            except Exception as e:
-                print(f"Error processing {image_file}: {e}")
-                continue
+        for event, data in simulate_robot(recursive, limit, workers):
+            if event == "start" and not data["total"]:
+                return jsonify({"error": "No image files found in test_images folder"}), 400
+            if event == "result":
+                results.append(data)
+            elif event == "done":
+                summary = data
         
         return jsonify({
             "success": True,
-            "total_scanned": total_scanned,
+            **summary,
             "results": results
         })
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def generate_result_image(image_path, predictions, filename):
-    """Generate result image with bounding boxes"""
+@app.route("/api/robot-simulate/stream")
+def robot_simulate_stream():
+    """Same simulation as server-sent events: ?recursive=1&limit=&workers="""
+    error = check_simulation_images()
+    if error:
+        return error
     try:
-        image = cv2.imread(image_path)
-        if image is None:
-            return None
-            
-        for pred in predictions:
-            x = int(pred["x"] - pred["width"] / 2)
-            y = int(pred["y"] - pred["height"] / 2)
-            w = int(pred["width"])
-            h = int(pred["height"])
-            conf = pred["confidence"]
-            class_name = pred["class"]
-            
-            # Draw bounding box
-            cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            
-            # Draw label
-            label = f"{class_name} {conf:.2f}"
-            (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-            cv2.rectangle(image, (x, y - label_h - 10), (x + label_w + 10, y), (0, 255, 0), -1)
-            cv2.putText(image, label, (x + 5, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
-        
-        result_filename = f"robot_result_{filename}"
-        result_path = os.path.join(RESULTS_DIR, result_filename)
-        cv2.imwrite(result_path, image)
-        
-        return f"/static/results/{result_filename}"
-        
-    except Exception as e:
-        print(f"Error generating result image: {e}")
-        return None
+        recursive, limit, workers = simulation_options(request.args)
+    except ValueError:
+        return jsonify({"error": "limit and workers must be integers"}), 400
+    
+    def stream():
+        try:
+            for event, data in simulate_robot(recursive, limit, workers):
+                yield format_event(event, data)
+        except Exception as e:
+            yield format_event("failed", {"error": str(e)})
+    
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/results/<name>")
+def get_result_image(name):
+    path = RESULTS.get(name)
+    if path is None:
+        return jsonify({"error": "Result image not found"}), 404
+    return send_file(path, mimetype="image/jpeg", conditional=True, etag=True)
+
+@app.route("/api/results/stats")
+def get_result_image_stats():
+    return jsonify(RESULTS.get_stats())
 
 # Robot-specific analytics endpoint
 @app.route("/api/robot-stats")
 def get_robot_stats():
-    conn = sqlite3.connect('road_survey.db')
-    c = conn.cursor()
+    with get_connection() as conn:
+        return _robot_stats(conn)
+
+def _robot_stats(conn):
+    # Robot-specific statistics from the aggregates
+    totals = get_totals(conn, source='robot')
     
-    # Get robot-specific statistics
-    c.execute('''SELECT 
-                    COUNT(*) as total_robot_surveys,
-                    SUM(visual_pollution) as total_visual_pollution,
-                    AVG(severity_score) as avg_severity
-                 FROM surveys WHERE source = 'robot' ''')
-    stats = c.fetchone()
+    c = conn.cursor()
     
-    # Get recent robot surveys
+    # Get recent robot surveys (idx_surveys_source_timestamp)
     c.execute('''SELECT timestamp, latitude, longitude, visual_pollution, description 
                  FROM surveys WHERE source = 'robot' ORDER BY timestamp DESC LIMIT 10''')
     recent_surveys = c.fetchall()
     
-    # Get visual pollution class distribution
-    c.execute('''SELECT description, visual_pollution 
+    # Visual pollution class distribution of every robot survey
+    # (idx_surveys_source_pollution)
+    c.execute('''SELECT description, visual_pollution
                  FROM surveys WHERE source = 'robot' AND visual_pollution > 0''')
     class_data = c.fetchall()
     
-    conn.close()
-    
     return jsonify({
-        "total_robot_surveys": stats[0] or 0,
-        "total_visual_pollution": stats[1] or 0,
-        "avg_severity": round(stats[2] or 0, 2),
+        "total_robot_surveys": totals["surveys"],
+        "total_visual_pollution": totals["visual_pollution"],
+        "avg_severity": round(totals["avg_severity"], 2),
         "recent_surveys": [{
             "timestamp": row[0],
             "latitude": row[1],
@@ -481,6 +930,31 @@ def get_robot_stats():
         "class_distribution": class_data
     })
 
+@app.route("/api/detection-cache/stats")
+def get_detection_cache_stats():
+    return jsonify(CLIENT.get_stats())
+
+@app.route("/api/survey-writer/stats")
+def get_survey_writer_stats():
+    return jsonify(survey_writer.get_stats())
+
+@app.route("/api/detection-cache/clear", methods=["POST"])
+def clear_detection_cache():
+    CLIENT.clear()
+    return jsonify({"success": True})
+
+@app.route("/api/admin/detectors")
+def get_detector_status():
+    breakers = BREAKERS.get_stats()
+    return jsonify({
+        key: {
+            "model_id": model["id"],
+            "backend": model["backend"],
+            **breakers.get(model["id"], {"state": "closed", "calls": 0})
+        }
+        for key, model in MODELS.items()
+    })
+
 @app.route("/api/assign-worker", methods=["POST"])
 def assign_worker():
     data = request.get_json()
@@ -495,6 +969,28 @@ def assign_worker():
         "message": f"Worker {worker_name} assigned to {issue_type} at location ({latitude}, {longitude}) with {priority} priority"
     })
 
+@app.cli.command("rebuild-aggregates")
+def rebuild_aggregates_command():
+    """Recompute the survey aggregate tables from the surveys table"""
+    survey_writer.flush()
+    with get_connection() as conn:
+        before = get_totals(conn)["surveys"]
+    count = rebuild_aggregates()
+    print(f"Rebuilt aggregates from {count} surveys (aggregates had {before})")
+
+@app.cli.command("backfill-detections")
+def backfill_detections_command():
+    """Recover detections of older surveys from their result image records"""
+    survey_writer.flush()
+    print(f"Backfilled {backfill_detections()} detections")
+
+@app.cli.command("rebuild-hotspots")
+def rebuild_hotspots_command():
+    """Recompute the hotspots from the surveys table"""
+    survey_writer.flush()
+    count = HOTSPOTS.rebuild()
+    print(f"Rebuilt {count} hotspots")
+
 if __name__ == "__main__":
     port = int(os.getenv('ROBOT_PORT', 5001))
     print(f"🤖 Starting Robot Service on port {port}...")
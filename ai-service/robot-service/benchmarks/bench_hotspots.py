@@ -0,0 +1,111 @@
+"""
+Hotspot Lookup Benchmark
+"Is there an issue near this point": grid-cell probes on
+(issue_type, cell_y, cell_x) versus a bounding-box query on the
+(latitude, longitude) index, plus merge throughput
+
+Usage (from robot-service/):
+    python -m benchmarks.bench_hotspots [--hotspots 1000000] [--lookups 2000]
+"""
+
+import os
+import math
+import time
+import random
+import argparse
+import tempfile
+
+from storage import connect, ISSUE_COLUMNS
+from hotspots import (init_hotspots, cell_of, find_nearby, merge_survey, distance_m,
+                      HOTSPOT_RADIUS_M, METRES_PER_DEGREE)
+
+# A city-sized area, so rows of cells are long and a lat/lng range is wide
+CENTER = (22.30, 73.18)
+SPAN = 0.25
+
+
+def random_point():
+    return CENTER[0] + random.uniform(-SPAN, SPAN), CENTER[1] + random.uniform(-SPAN, SPAN)
+
+
+def fill(conn, count):
+    batch = []
+    for _ in range(count):
+        latitude, longitude = random_point()
+        cell_y, cell_x = cell_of(latitude, longitude)
+        batch.append((random.choice(ISSUE_COLUMNS), cell_y, cell_x, latitude, longitude))
+        if len(batch) == 50000:
+            _insert(conn, batch)
+            batch = []
+    _insert(conn, batch)
+
+
+def _insert(conn, batch):
+    with conn:
+        conn.executemany('''INSERT INTO hotspots (issue_type, cell_y, cell_x, latitude, longitude, surveys,
+                                detections, max_severity, first_seen, last_seen)
+                            VALUES (?, ?, ?, ?, ?, 1, 1, 1, NULL, NULL)''', batch)
+
+
+def bbox_lookup(conn, latitude, longitude, radius_m, issue_type):
+    d_lat = radius_m / METRES_PER_DEGREE
+    d_lng = d_lat / math.cos(math.radians(latitude))
+    rows = conn.execute('''SELECT id, latitude, longitude FROM hotspots INDEXED BY idx_hotspots_lat_lng
+                           WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ? AND issue_type = ?''',
+                        (latitude - d_lat, latitude + d_lat, longitude - d_lng, longitude + d_lng,
+                         issue_type)).fetchall()
+    return [row for row in rows if distance_m(latitude, longitude, row[1], row[2]) <= radius_m]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.95)] * 1000
+
+
+def bench_lookups(fn, conn, queries):
+    samples = []
+    found = 0
+    for latitude, longitude, issue_type in queries:
+        start = time.perf_counter()
+        found += len(fn(conn, latitude, longitude, issue_type))
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples), found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hotspots', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--merges', type=int, default=5000)
+    args = parser.parse_args()
+    random.seed(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, 'bench.db'))
+        init_hotspots(conn)
+        start = time.perf_counter()
+        fill(conn, args.hotspots)
+        print(f"{args.hotspots} hotspots loaded in {time.perf_counter() - start:.1f}s")
+
+        queries = [(*random_point(), random.choice(ISSUE_COLUMNS)) for _ in range(args.lookups)]
+        cells = lambda conn, lat, lng, issue_type: find_nearby(conn, lat, lng, HOTSPOT_RADIUS_M, [issue_type])
+        bbox = lambda conn, lat, lng, issue_type: bbox_lookup(conn, lat, lng, HOTSPOT_RADIUS_M, issue_type)
+
+        print(f"{'lookup':>14} {'p50':>9} {'p95':>9} {'found':>7}")
+        for name, fn in (("lat/lng index", bbox), ("grid cells", cells)):
+            (p50, p95), found = bench_lookups(fn, conn, queries)
+            print(f"{name:>14} {p50:>6.3f} ms {p95:>6.3f} ms {found:>7}")
+
+        surveys = [dict(zip(("latitude", "longitude"), random_point()), timestamp="2026-01-01T00:00:00",
+                        **{random.choice(ISSUE_COLUMNS): 1}) for _ in range(args.merges)]
+        start = time.perf_counter()
+        with conn:
+            for survey in surveys:
+                merge_survey(conn, survey)
+        elapsed = time.perf_counter() - start
+        print(f"merged {args.merges} surveys: {args.merges / elapsed:.0f} surveys/s")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
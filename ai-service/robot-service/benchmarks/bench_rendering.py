@@ -0,0 +1,90 @@
+"""
+Detection Rendering Benchmark
+Compares the per-prediction copy + blend drawing with rendering.py's single pass
+
+Usage (from robot-service/):
+    python -m benchmarks.bench_rendering [--width 1920] [--height 1080] [--iterations 20]
+"""
+
+import time
+import random
+import argparse
+
+import cv2
+import numpy as np
+
+from rendering import render_detections
+
+COLORS = [(0, 0, 255), (0, 165, 255), (255, 0, 255), (0, 255, 255), (255, 0, 0), (0, 255, 0)]
+
+
+def make_predictions(count, width, height):
+    predictions = []
+    for _ in range(count):
+        w = random.uniform(0.03, 0.25) * width
+        h = random.uniform(0.03, 0.25) * height
+        predictions.append({
+            "x": random.uniform(w / 2, width - w / 2),
+            "y": random.uniform(h / 2, height - h / 2),
+            "width": w,
+            "height": h,
+            "confidence": random.random(),
+            "class": random.choice(["pothole", "garbage", "crack", "open_manhole"]),
+            "color": random.choice(COLORS),
+        })
+    return predictions
+
+
+def per_prediction_blend(image, predictions):
+    """What /detect used to do: copy and blend the full image per prediction"""
+    for pred in predictions:
+        x = int(pred["x"] - pred["width"] / 2)
+        y = int(pred["y"] - pred["height"] / 2)
+        w = int(pred["width"])
+        h = int(pred["height"])
+        color = pred["color"]
+
+        overlay = image.copy()
+        cv2.rectangle(overlay, (x, y), (x + w, y + h), color, -1)
+        cv2.addWeighted(overlay, 0.2, image, 0.8, 0, image)
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, 2)
+
+        label = f"{pred['class']} {pred['confidence']:.2f}"
+        (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+        cv2.rectangle(image, (x, y - label_h - 10), (x + label_w + 10, y), (255, 255, 255), -1)
+        cv2.rectangle(image, (x, y - label_h - 10), (x + label_w + 10, y), color, 2)
+        cv2.putText(image, label, (x + 5, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+    return image
+
+
+def single_pass(image, predictions):
+    return render_detections(image, predictions, color_for=lambda pred: pred["color"])
+
+
+def bench(fn, base, predictions, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(base.copy(), predictions)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    base = np.random.randint(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    print(f"{args.width}x{args.height}, {args.iterations} iterations")
+    print(f"{'detections':>10} {'per-prediction':>16} {'single pass':>13} {'speedup':>8}")
+
+    for count in (1, 5, 10, 25, 50, 100):
+        predictions = make_predictions(count, args.width, args.height)
+        old = bench(per_prediction_blend, base, predictions, args.iterations)
+        new = bench(single_pass, base, predictions, args.iterations)
+        print(f"{count:>10} {old:>13.2f} ms {new:>10.2f} ms {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
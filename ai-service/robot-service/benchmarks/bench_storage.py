@@ -0,0 +1,115 @@
+"""
+Survey Storage Benchmark
+Compares connect-per-insert commits with the pooled WAL + batched writer in storage.py
+
+Usage (from robot-service/):
+    python -m benchmarks.bench_storage [--surveys 2000] [--threads 8] [--readers 2]
+"""
+
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+import storage
+from storage import make_survey, SurveyWriter, INSERT_SURVEY_SQL, SURVEY_COLUMNS
+
+STATS_SQL = 'SELECT COUNT(*), SUM(potholes), SUM(garbage), AVG(severity_score) FROM surveys'
+
+
+def random_survey():
+    counts = {column: random.randint(0, 3) for column in storage.ISSUE_COLUMNS}
+    return make_survey(22.3 + random.random() * 0.1, 73.1 + random.random() * 0.1, counts,
+                       report_type='robot_survey', source='robot')
+
+
+def create_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE surveys
+                 (id INTEGER PRIMARY KEY, timestamp TEXT, latitude REAL, longitude REAL,
+                  potholes INTEGER, garbage INTEGER, manholes INTEGER, damaged_roads INTEGER,
+                  construction_debris INTEGER, stray_animals INTEGER, water_leakage INTEGER,
+                  visual_pollution INTEGER, total_issues INTEGER, severity_score REAL,
+                  description TEXT, report_type TEXT, source TEXT, result_image TEXT)''')
+    conn.commit()
+    conn.close()
+
+
+def connect_per_insert(path, row):
+    """What app.py used to do for every survey"""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute(INSERT_SURVEY_SQL, [row[column] for column in SURVEY_COLUMNS])
+    conn.commit()
+    conn.close()
+
+
+def run(label, path, write, rows, threads, readers, finish=None):
+    """Write rows from `threads` threads while `readers` threads run the stats query"""
+    latencies = []
+    stop = threading.Event()
+
+    def reader():
+        conn = storage.connect(path) if finish else sqlite3.connect(path, timeout=30)
+        while not stop.is_set():
+            started = time.perf_counter()
+            conn.execute(STATS_SQL).fetchone()
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.005)
+        conn.close()
+
+    def writer(chunk):
+        for row in chunk:
+            write(row)
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for t in reader_threads:
+        t.start()
+
+    started = time.perf_counter()
+    writer_threads = [threading.Thread(target=writer, args=(rows[i::threads],)) for i in range(threads)]
+    for t in writer_threads:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    if finish:
+        finish()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for t in reader_threads:
+        t.join()
+
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0
+    print(f"{label:<28} {len(rows) / elapsed:9.0f} surveys/s  {elapsed:6.2f} s  "
+          f"read p95 {p95:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--surveys', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=2)
+    args = parser.parse_args()
+
+    rows = [random_survey() for _ in range(args.surveys)]
+    print(f"{args.surveys} surveys, {args.threads} writer threads, {args.readers} readers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, 'connect_per_insert.db')
+        create_db(old_path)
+        run("connect + commit per insert", old_path,
+            lambda row: connect_per_insert(old_path, row), rows, args.threads, args.readers)
+
+        new_path = os.path.join(tmp, 'batched.db')
+        create_db(new_path)
+        writer = SurveyWriter(path=new_path)
+        run("WAL + batched writer", new_path, writer.submit, rows, args.threads, args.readers,
+            finish=writer.flush)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Upload Pipeline Benchmark
+CPU time per /detect upload: PIL decode + JPEG re-encode + read-back versus
+the decode-once Frame
+
+Both pipelines produce what a request needs: the stored upload, the bytes
+sent to the hosted API, the detection cache digest and a BGR array for
+local models.
+
+Usage (from robot-service/):
+    python -m benchmarks.bench_upload [--width 1920] [--height 1080] [--iterations 30]
+"""
+
+import io
+import os
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from detectors import Frame, DECODE_FLAGS
+from detection_cache import image_digest
+
+
+def make_photo(width, height):
+    """Smooth gradients, shapes and sensor noise: compresses like a photo, unlike pure noise"""
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.stack([x * 255 / width, y * 255 / height, (x + y) * 127 / (width + height)], axis=-1)
+    image = image.astype(np.uint8)
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.circle(image, center, int(rng.integers(10, height // 4)), color, -1)
+    noise = rng.normal(0, 6, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def old_pipeline(data, path):
+    img = Image.open(io.BytesIO(data))
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGB')
+    img.save(path, 'JPEG', quality=95)
+
+    with open(path, 'rb') as f:
+        body = f.read()
+    digest = image_digest(path)
+    array = cv2.imread(path, DECODE_FLAGS)
+    return body, digest, array
+
+
+def new_pipeline(data, path):
+    frame = Frame(data)
+    frame.save(path)
+    return frame.jpeg, image_digest(frame), frame.array
+
+
+def bench(fn, data, path, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(data, path)
+    return (time.process_time() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--iterations', type=int, default=30)
+    args = parser.parse_args()
+
+    photo = make_photo(args.width, args.height)
+    uploads = {
+        "jpeg": cv2.imencode('.jpg', photo, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes(),
+        "png": cv2.imencode('.png', photo)[1].tobytes(),
+    }
+
+    print(f"{args.width}x{args.height}, {args.iterations} iterations, CPU ms per upload")
+    print(f"{'upload':>8} {'old':>10} {'decode-once':>12} {'saved':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'upload.jpg')
+        for kind, data in uploads.items():
+            old = bench(old_pipeline, data, path, args.iterations)
+            new = bench(new_pipeline, data, path, args.iterations)
+            print(f"{kind:>8} {old:>7.1f} ms {new:>9.1f} ms {old - new:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
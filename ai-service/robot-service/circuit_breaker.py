@@ -0,0 +1,165 @@
+"""
+Per-model circuit breakers for detector calls.
+
+A model whose recent failure rate crosses the threshold is "opened" and
+skipped immediately instead of costing its full timeout on every request.
+After a cool-down one trial call is let through (half-open); success closes
+the circuit again, failure re-opens it.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+from detectors import Detector
+
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', 0.5))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', 5))
+BREAKER_WINDOW = float(os.getenv('BREAKER_WINDOW', 60))
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', 30))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_rate=BREAKER_FAILURE_RATE, min_calls=BREAKER_MIN_CALLS,
+                 window=BREAKER_WINDOW, open_seconds=BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.outcomes = deque()  # (timestamp, succeeded) within the window
+        self.latencies = deque(maxlen=200)
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    def _prune(self, now):
+        while self.outcomes and now - self.outcomes[0][0] > self.window:
+            self.outcomes.popleft()
+
+    def _current_failure_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for _, ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def allow(self):
+        """Whether a call may go through now"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN and time.time() - self.opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self.trial_in_flight = False
+
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record(self, succeeded, latency, error=None):
+        now = time.time()
+        with self.lock:
+            self.calls += 1
+            self.latencies.append(latency)
+            if not succeeded:
+                self.failures += 1
+                self.last_error = error
+
+            if self.state == HALF_OPEN:
+                self.trial_in_flight = False
+                if succeeded:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                else:
+                    self.state = OPEN
+                    self.opened_at = now
+                return
+
+            self.outcomes.append((now, succeeded))
+            self._prune(now)
+            if (self.state == CLOSED and len(self.outcomes) >= self.min_calls
+                    and self._current_failure_rate() >= self.failure_rate):
+                self.state = OPEN
+                self.opened_at = now
+
+    def snapshot(self):
+        with self.lock:
+            self._prune(time.time())
+            latencies = sorted(self.latencies)
+
+            def percentile(p):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+            return {
+                "state": self.state,
+                "failure_rate": round(self._current_failure_rate(), 3),
+                "window_calls": len(self.outcomes),
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+                "latency_ms": {
+                    "avg": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                    "p50": percentile(0.5),
+                    "p95": percentile(0.95),
+                    "max": round(latencies[-1] * 1000, 1) if latencies else None,
+                },
+                "retry_in": max(0.0, round(self.opened_at + self.open_seconds - time.time(), 1))
+                if self.state == OPEN else None,
+            }
+
+
+class BreakerDetector(Detector):
+    """Wrap a detector with one circuit breaker per model id"""
+
+    name = "breaker"
+
+    def __init__(self, detector):
+        self.detector = detector
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def breaker_for(self, model_id):
+        with self.lock:
+            if model_id not in self.breakers:
+                self.breakers[model_id] = CircuitBreaker(model_id)
+            return self.breakers[model_id]
+
+    def infer(self, image, model_id):
+        breaker = self.breaker_for(model_id)
+        if not breaker.allow():
+            raise CircuitOpenError(f"circuit open for {model_id}")
+
+        started = time.monotonic()
+        try:
+            result = self.detector.infer(image, model_id)
+        except Exception as e:
+            breaker.record(False, time.monotonic() - started, str(e))
+            raise
+        breaker.record(True, time.monotonic() - started)
+        return result
+
+    def get_stats(self):
+        with self.lock:
+            breakers = dict(self.breakers)
+        return {model_id: breaker.snapshot() for model_id, breaker in breakers.items()}
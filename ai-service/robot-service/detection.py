@@ -0,0 +1,117 @@
+"""
+Detection planner for the robot service.
+
+Several entries in MODELS can point at the same Roboflow model id. The
+planner groups model keys by id, calls each distinct model once, runs the
+calls concurrently with per-model timeouts and attributes the predictions
+back to every key that shares the id.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+DETECT_TIMEOUT = float(os.getenv('DETECT_TIMEOUT', 15))
+DETECT_MAX_WORKERS = int(os.getenv('DETECT_MAX_WORKERS', 16))
+# Survey runs and videos get their own threads, so a large batch never
+# queues ahead of interactive /detect calls
+DETECT_BATCH_WORKERS = int(os.getenv('DETECT_BATCH_WORKERS', 8))
+
+_executor = ThreadPoolExecutor(max_workers=DETECT_MAX_WORKERS, thread_name_prefix="detect")
+_batch_executor = ThreadPoolExecutor(max_workers=DETECT_BATCH_WORKERS, thread_name_prefix="detect-batch")
+# Survey runs and videos run concurrently (ROBOT_RUN_WORKERS, VIDEO_WORKERS):
+# one chunk at a time on the batch executor, so no call waits in its queue
+# while its deadline runs
+_batch_lock = threading.Lock()
+
+
+def plan_detection(models, model_keys):
+    """Group model keys by model id -> {model_id: [model_key, ...]}"""
+    plan = {}
+    for key in model_keys:
+        plan.setdefault(models[key]["id"], []).append(key)
+    return plan
+
+
+def all_models_failed(errors, models, model_keys):
+    """True if every distinct model id planned for model_keys failed"""
+    return len(errors) == len(plan_detection(models, model_keys))
+
+
+def _fan_out(client, image, plan, models, timeout, started, executor=_executor):
+    """Submit one call per model id; deadlines are model timeouts from `started`"""
+    futures = {}
+    deadlines = {}
+    for model_id, keys in plan.items():
+        model_timeout = max(models[key].get("timeout", timeout or DETECT_TIMEOUT) for key in keys)
+        deadlines[model_id] = started + model_timeout
+        futures[model_id] = executor.submit(client.infer, image, model_id=model_id)
+    return futures, deadlines
+
+
+def _collect(plan, models, futures, deadlines):
+    all_predictions = []
+    issue_counts = {key: 0 for key in models.keys()}
+    errors = {}
+
+    for model_id in sorted(futures, key=deadlines.get):
+        future = futures[model_id]
+        try:
+            result = future.result(timeout=max(0, deadlines[model_id] - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            errors[model_id] = "timeout"
+            continue
+        except Exception as e:
+            errors[model_id] = str(e)
+            continue
+
+        for key in plan[model_id]:
+            for pred in result["predictions"]:
+                pred = dict(pred)
+                pred["model_type"] = key
+                all_predictions.append(pred)
+            issue_counts[key] = len(result["predictions"])
+
+    return all_predictions, issue_counts, errors
+
+
+def run_detection(client, image, models, model_keys, timeout=None):
+    """
+    Run every distinct model needed for `model_keys` on one image.
+
+    Each model id gets the largest "timeout" of its keys in MODELS (or
+    DETECT_TIMEOUT), counted from when the calls are fanned out, so the
+    whole call takes roughly as long as the slowest model.
+
+    Returns (predictions, issue_counts, errors): predictions are tagged with
+    "model_type", issue_counts has an entry for every MODELS key, errors maps
+    failed model ids to a message.
+    """
+    plan = plan_detection(models, model_keys)
+    futures, deadlines = _fan_out(client, image, plan, models, timeout, time.monotonic())
+    return _collect(plan, models, futures, deadlines)
+
+
+def run_detection_batch(client, images, models, model_keys, timeout=None):
+    """
+    run_detection for many images on the batch executor. Images are sent
+    in chunks that fill DETECT_BATCH_WORKERS once, and concurrent batches
+    take turns chunk by chunk, so every call starts right away and keeps
+    the plain per-model deadline (as long as DETECT_BATCH_WORKERS is at
+    least the number of distinct model ids).
+
+    Returns one (predictions, issue_counts, errors) per image, in order.
+    """
+    plan = plan_detection(models, model_keys)
+    chunk = max(1, DETECT_BATCH_WORKERS // len(plan))
+
+    results = []
+    for start in range(0, len(images), chunk):
+        with _batch_lock:
+            started = time.monotonic()
+            pending = [_fan_out(client, image, plan, models, timeout, started, _batch_executor)
+                       for image in images[start:start + chunk]]
+            results.extend(_collect(plan, models, futures, deadlines) for futures, deadlines in pending)
+    return results
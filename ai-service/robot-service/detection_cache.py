@@ -0,0 +1,234 @@
+"""
+Content-addressed cache for detector calls.
+
+Results are keyed by model id + SHA-256 of the image content, so the same
+frame is never sent to the same model twice, whatever its file name. A
+bounded in-memory LRU sits in front of an optional persistent tier
+(SQLite or Redis) with a TTL.
+"""
+
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from detectors import Detector, Frame
+
+DETECTION_CACHE_SIZE = int(os.getenv('DETECTION_CACHE_SIZE', 2048))
+DETECTION_CACHE_TTL = int(os.getenv('DETECTION_CACHE_TTL', 86400))
+# "", "sqlite" or "redis"
+DETECTION_CACHE_BACKEND = os.getenv('DETECTION_CACHE_BACKEND', '')
+DETECTION_CACHE_PATH = os.getenv('DETECTION_CACHE_PATH', 'detection_cache.db')
+DETECTION_CACHE_REDIS_URL = os.getenv('DETECTION_CACHE_REDIS_URL', 'redis://localhost:6379/1')
+
+
+def image_digest(image):
+    """SHA-256 of a file's content, encoded image bytes or a decoded array"""
+    sha = hashlib.sha256()
+    if isinstance(image, Frame):
+        # Same digest as the saved upload file
+        sha.update(image.jpeg)
+    elif isinstance(image, np.ndarray):
+        sha.update(f"{image.shape}{image.dtype}".encode())
+        sha.update(np.ascontiguousarray(image).data)
+    elif isinstance(image, (bytes, bytearray, memoryview)):
+        sha.update(image)
+    else:
+        with open(image, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+    return sha.hexdigest()
+
+
+class MemoryTier:
+    """Bounded LRU with per-entry expiry"""
+
+    name = "memory"
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def size(self):
+        return len(self.entries)
+
+
+class SQLiteTier:
+    """Persistent tier in a local SQLite file"""
+
+    name = "sqlite"
+
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS detection_cache
+                             (key TEXT PRIMARY KEY, value TEXT, expires REAL)''')
+        self.conn.execute('DELETE FROM detection_cache WHERE expires < ?', (time.time(),))
+        self.conn.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT value FROM detection_cache WHERE key = ? AND expires >= ?',
+                (key, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO detection_cache VALUES (?, ?, ?)',
+                              (key, json.dumps(value), time.time() + self.ttl))
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute('DELETE FROM detection_cache')
+            self.conn.commit()
+
+    def size(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM detection_cache').fetchone()[0]
+
+
+class RedisTier:
+    """Persistent tier in Redis, shared between service instances"""
+
+    name = "redis"
+    prefix = "robot:detections:"
+
+    def __init__(self, url, ttl):
+        import redis
+
+        self.ttl = ttl
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.client.ping()
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        return json.loads(data) if data else None
+
+    def set(self, key, value):
+        self.client.setex(self.prefix + key, self.ttl, json.dumps(value))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + '*'))
+
+
+def create_persistent_tier(backend=DETECTION_CACHE_BACKEND):
+    """Build the configured persistent tier, or None"""
+    if backend == "sqlite":
+        return SQLiteTier(DETECTION_CACHE_PATH, DETECTION_CACHE_TTL)
+    if backend == "redis":
+        try:
+            return RedisTier(DETECTION_CACHE_REDIS_URL, DETECTION_CACHE_TTL)
+        except Exception as e:
+            print(f"Detection cache: Redis not available ({e}), using memory only")
+    return None
+
+
+class CachedDetector(Detector):
+    """Wrap a detector with the memory + persistent detection cache"""
+
+    name = "cached"
+
+    def __init__(self, detector, max_entries=DETECTION_CACHE_SIZE, persistent=None):
+        self.detector = detector
+        self.memory = MemoryTier(max_entries, DETECTION_CACHE_TTL)
+        self.persistent = persistent
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def _count(self, model_id, outcome):
+        with self.lock:
+            counts = self.stats.setdefault(model_id, {"memory_hits": 0, "persistent_hits": 0, "misses": 0})
+            counts[outcome] += 1
+
+    def infer(self, image, model_id):
+        key = f"{model_id}:{image_digest(image)}"
+
+        result = self.memory.get(key)
+        if result is not None:
+            self._count(model_id, "memory_hits")
+            # Callers annotate predictions in place, never hand out the cached copy
+            return copy.deepcopy(result)
+
+        if self.persistent is not None:
+            try:
+                result = self.persistent.get(key)
+            except Exception as e:
+                print(f"Detection cache read failed: {e}")
+                result = None
+            if result is not None:
+                self.memory.set(key, result)
+                self._count(model_id, "persistent_hits")
+                return copy.deepcopy(result)
+
+        self._count(model_id, "misses")
+        result = self.detector.infer(image, model_id)
+
+        self.memory.set(key, copy.deepcopy(result))
+        if self.persistent is not None:
+            try:
+                self.persistent.set(key, result)
+            except Exception as e:
+                print(f"Detection cache write failed: {e}")
+
+        return result
+
+    def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def get_stats(self):
+        with self.lock:
+            per_model = {}
+            for model_id, counts in self.stats.items():
+                hits = counts["memory_hits"] + counts["persistent_hits"]
+                total = hits + counts["misses"]
+                per_model[model_id] = dict(counts, hit_rate=round(hits / total, 3) if total else 0.0)
+
+        return {
+            "memory_entries": self.memory.size(),
+            "memory_max_entries": self.memory.max_entries,
+            "persistent_backend": self.persistent.name if self.persistent else None,
+            "ttl": DETECTION_CACHE_TTL,
+            "models": per_model,
+        }
@@ -0,0 +1,239 @@
+"""
+Detector backends for the robot service.
+
+Every backend exposes infer(image, model_id) -> {"predictions": [...]} in the
+Roboflow response format (x/y are box centres). `image` can be a file path,
+encoded image bytes, a BGR numpy array or a Frame (decoded once, both forms).
+
+- HostedDetector: the Roboflow inference API (or the local stand-in in
+  mock_roboflow.py) over pooled keep-alive connections
+- LocalYOLODetector: in-process YOLOv8 using ai-service/src/model.py
+
+DetectorRouter picks the backend per model from the "backend" entry in MODELS.
+"""
+
+import os
+import sys
+import base64
+import threading
+
+import cv2
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+ROBOFLOW_API_URL = os.getenv('ROBOFLOW_API_URL', 'https://serverless.roboflow.com')
+ROBOFLOW_API_KEY = os.getenv('ROBOFLOW_API_KEY', 'wDn97RYRazmoOEE8okiH')
+DETECTOR_POOL_SIZE = int(os.getenv('DETECTOR_POOL_SIZE', 16))
+DETECTOR_CONNECT_TIMEOUT = float(os.getenv('DETECTOR_CONNECT_TIMEOUT', 3))
+DETECT_TIMEOUT = float(os.getenv('DETECT_TIMEOUT', 15))
+
+# "hosted" or "local"; DETECTOR_BACKENDS overrides single keys: "potholes=local,garbage=hosted"
+DETECTOR_BACKEND = os.getenv('DETECTOR_BACKEND', 'hosted')
+DETECTOR_BACKENDS = os.getenv('DETECTOR_BACKENDS', '')
+
+AI_SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LOCAL_MODELS_DIR = os.getenv('LOCAL_MODELS_DIR', os.path.join(AI_SERVICE_DIR, 'models'))
+
+# Pixels as stored in the file: the hosted API receives the original bytes,
+# so boxes and rendering must not depend on EXIF rotation
+DECODE_FLAGS = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+FRAME_JPEG_QUALITY = 95
+
+
+def encode_jpeg(image, quality=FRAME_JPEG_QUALITY):
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode image")
+    return buffer.tobytes()
+
+
+class Frame:
+    """
+    An uploaded image, decoded once.
+
+    `array` is the BGR image for local models and drawing; `jpeg` is the
+    original upload when it already is a JPEG, otherwise it is encoded once
+    on first use. Hosted calls, caching and storage all reuse these.
+    """
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.array = cv2.imdecode(np.frombuffer(self.data, dtype=np.uint8), DECODE_FLAGS)
+        if self.array is None:
+            raise ValueError("Could not decode image")
+        self.is_jpeg = self.data[:3] == b"\xff\xd8\xff"
+        self._jpeg = self.data if self.is_jpeg else None
+        self.lock = threading.Lock()
+
+    @property
+    def jpeg(self):
+        with self.lock:
+            if self._jpeg is None:
+                self._jpeg = encode_jpeg(self.array)
+            return self._jpeg
+
+    def save(self, path):
+        """Write the JPEG form: the original bytes, without re-encoding, for JPEG uploads"""
+        with open(path, "wb") as f:
+            f.write(self.jpeg)
+
+
+def decode_image(image):
+    """Return a path or BGR array unchanged, decode encoded bytes into a BGR array"""
+    if isinstance(image, Frame):
+        return image.array
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        decoded = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), DECODE_FLAGS)
+        if decoded is None:
+            raise ValueError("Could not decode image bytes")
+        return decoded
+    return image
+
+
+def configure_backends(models):
+    """Fill in the "backend" of every MODELS entry from the environment"""
+    overrides = dict(
+        item.split('=', 1) for item in DETECTOR_BACKENDS.split(',') if '=' in item
+    )
+    for key, model in models.items():
+        model.setdefault("backend", overrides.get(key, DETECTOR_BACKEND).strip())
+    return models
+
+
+class Detector:
+    """Base class for detection backends"""
+
+    name = "base"
+
+    def infer(self, image, model_id):
+        raise NotImplementedError
+
+
+class HostedDetector(Detector):
+    """
+    Roboflow hosted (v0) API: POST <api_url>/<project>/<version>?api_key=...
+    with the base64 encoded image as body.
+
+    One requests.Session is shared by all threads, so calls reuse pooled
+    keep-alive connections instead of a new TCP/TLS handshake per call.
+    """
+
+    name = "hosted"
+
+    def __init__(self, api_url=ROBOFLOW_API_URL, api_key=ROBOFLOW_API_KEY,
+                 pool_size=DETECTOR_POOL_SIZE, timeout=DETECT_TIMEOUT):
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = (DETECTOR_CONNECT_TIMEOUT, timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def encode(self, image):
+        """JPEG bytes for the request body (encoded input is sent as is)"""
+        if isinstance(image, Frame):
+            return image.jpeg
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return bytes(image)
+        if isinstance(image, np.ndarray):
+            return encode_jpeg(image, quality=90)
+        with open(image, "rb") as f:
+            return f.read()
+
+    def infer(self, image, model_id):
+        response = self.session.post(
+            f"{self.api_url}/{model_id}",
+            params={"api_key": self.api_key},
+            data=base64.b64encode(self.encode(image)),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+class LocalYOLODetector(Detector):
+    """In-process YOLOv8, one model per model id"""
+
+    name = "local"
+
+    def __init__(self, models=None):
+        self.models = models or {}
+        self.handlers = {}
+        self.lock = threading.Lock()
+
+    def weights_for(self, model_id):
+        """MODELS "weights" entry, else <LOCAL_MODELS_DIR>/<project>.pt"""
+        weights = None
+        for model in self.models.values():
+            if model["id"] == model_id and model.get("weights"):
+                weights = model["weights"]
+                break
+        if weights is None:
+            weights = os.path.join(LOCAL_MODELS_DIR, model_id.split('/')[0] + '.pt')
+        # YOLOv8Handler would silently load the COCO yolov8n.pt instead
+        if not os.path.isfile(weights):
+            raise FileNotFoundError(f"No local weights for {model_id}: {weights} does not exist "
+                                    f"(set MODELS[key][\"weights\"] or LOCAL_MODELS_DIR)")
+        return weights
+
+    def handler_for(self, model_id):
+        with self.lock:
+            if model_id not in self.handlers:
+                weights = self.weights_for(model_id)
+                if AI_SERVICE_DIR not in sys.path:
+                    sys.path.insert(0, AI_SERVICE_DIR)
+                from src.model import YOLOv8Handler
+
+                self.handlers[model_id] = YOLOv8Handler(weights)
+            return self.handlers[model_id]
+
+    def infer(self, image, model_id):
+        detections = self.handler_for(model_id).predict(decode_image(image))
+
+        predictions = []
+        for det in detections:
+            x1, y1, x2, y2 = det["bbox"]
+            predictions.append({
+                "x": (x1 + x2) / 2,
+                "y": (y1 + y2) / 2,
+                "width": x2 - x1,
+                "height": y2 - y1,
+                "confidence": det["confidence"],
+                "class": det["class_name"],
+            })
+        return {"predictions": predictions}
+
+
+class DetectorRouter(Detector):
+    """Send each model id to the backend selected for it in MODELS"""
+
+    name = "router"
+
+    def __init__(self, models):
+        self.models = configure_backends(models)
+        self.backends = {}
+        self.lock = threading.Lock()
+
+    def backend_for(self, model_id):
+        backend = DETECTOR_BACKEND
+        for model in self.models.values():
+            if model["id"] == model_id:
+                backend = model["backend"]
+                break
+
+        with self.lock:
+            if backend not in self.backends:
+                if backend == "local":
+                    self.backends[backend] = LocalYOLODetector(self.models)
+                elif backend == "hosted":
+                    self.backends[backend] = HostedDetector()
+                else:
+                    raise ValueError(f"Unknown detector backend: {backend}")
+            return self.backends[backend]
+
+    def infer(self, image, model_id):
+        return self.backend_for(model_id).infer(image, model_id)
@@ -0,0 +1,109 @@
+"""
+Server-side heatmap binning.
+
+Surveys inside the requested bounding box are binned into a fixed global
+lat/lng grid whose cell size follows the zoom level, so the response holds
+at most one cell per few screen pixels of the viewport instead of every
+survey ever recorded.
+"""
+
+import os
+
+import numpy as np
+
+# Grid cells per 256px map tile at a zoom level (32 -> 8px cells)
+HEATMAP_CELLS_PER_TILE = int(os.getenv('HEATMAP_CELLS_PER_TILE', 32))
+HEATMAP_MAX_CELLS = int(os.getenv('HEATMAP_MAX_CELLS', 4096))
+HEATMAP_DEFAULT_ZOOM = 12
+MAX_ZOOM = 20
+
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+
+HEATMAP_SQL = '''SELECT latitude, longitude, severity_score FROM surveys
+                 WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?'''
+
+
+def parse_bbox(value):
+    """'minLng,minLat,maxLng,maxLat' -> tuple of floats (whole world if empty)"""
+    if not value:
+        return WORLD_BBOX
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError("bbox must be minLng,minLat,maxLng,maxLat")
+    min_lng, min_lat, max_lng, max_lat = parts
+    if min_lng > max_lng or min_lat > max_lat:
+        raise ValueError("bbox minimum is larger than its maximum")
+    return (max(min_lng, -180.0), max(min_lat, -90.0), min(max_lng, 180.0), min(max_lat, 90.0))
+
+
+def cell_size_for(zoom, bbox, max_cells=HEATMAP_MAX_CELLS):
+    """
+    Cell size in degrees for a zoom level: a tile spans 360 / 2**zoom degrees
+    of longitude, split into HEATMAP_CELLS_PER_TILE cells. Doubled until the
+    bounding box fits in max_cells, so the response size stays bounded even
+    for a large bbox at a high zoom.
+    """
+    zoom = min(max(int(zoom), 0), MAX_ZOOM)
+    cell = 360.0 / (2 ** zoom) / HEATMAP_CELLS_PER_TILE
+
+    min_lng, min_lat, max_lng, max_lat = bbox
+    while (np.ceil((max_lng - min_lng) / cell + 1) * np.ceil((max_lat - min_lat) / cell + 1)) > max_cells:
+        cell *= 2
+    return cell
+
+
+def bin_points(latitudes, longitudes, severities, cell):
+    """
+    Sum survey severity per grid cell.
+
+    Returns a list of {"lat", "lng", "intensity", "count", "severity"}, where
+    lat/lng is the mean position of the surveys in the cell and intensity is
+    the summed severity scaled to 0..1 like the per-survey intensity was.
+    """
+    if len(latitudes) == 0:
+        return []
+
+    lat = np.asarray(latitudes, dtype=np.float64)
+    lng = np.asarray(longitudes, dtype=np.float64)
+    severity = np.nan_to_num(np.asarray(severities, dtype=np.float64))
+
+    # Cells are anchored at 0,0 so they stay put when the viewport pans
+    rows = np.floor(lat / cell).astype(np.int64)
+    cols = np.floor(lng / cell).astype(np.int64)
+    cells, index = np.unique(np.stack([rows, cols], axis=1), axis=0, return_inverse=True)
+    index = index.reshape(-1)
+
+    counts = np.bincount(index, minlength=len(cells))
+    severity_sum = np.bincount(index, weights=severity, minlength=len(cells))
+    mean_lat = np.bincount(index, weights=lat, minlength=len(cells)) / counts
+    mean_lng = np.bincount(index, weights=lng, minlength=len(cells)) / counts
+    intensity = np.minimum(severity_sum / 10, 1.0)
+
+    return [{
+        "lat": round(float(mean_lat[i]), 6),
+        "lng": round(float(mean_lng[i]), 6),
+        "intensity": round(float(intensity[i]), 4),
+        "count": int(counts[i]),
+        "severity": round(float(severity_sum[i]), 2),
+    } for i in range(len(cells))]
+
+
+def heatmap_cells(conn, bbox=WORLD_BBOX, zoom=HEATMAP_DEFAULT_ZOOM):
+    """Binned heatmap for the surveys inside bbox (served by idx_surveys_lat_lng)"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    rows = conn.execute(HEATMAP_SQL, (min_lat, max_lat, min_lng, max_lng)).fetchall()
+
+    cell = cell_size_for(zoom, bbox)
+    if rows:
+        latitudes, longitudes, severities = zip(*rows)
+        cells = bin_points(latitudes, longitudes, [s or 0 for s in severities], cell)
+    else:
+        cells = []
+
+    return {
+        "zoom": zoom,
+        "bbox": list(bbox),
+        "cell_size": cell,
+        "surveys": len(rows),
+        "cells": cells,
+    }
@@ -0,0 +1,200 @@
+"""
+Issue hotspots: nearby surveys of the same issue type merged into clusters.
+
+Points are binned into a fixed grid of HOTSPOT_CELL_M metre cells (in
+latitude; longitude cells are the same size in degrees). Every hotspot
+stores the cell of its centre, indexed by (issue_type, cell_y, cell_x), so
+"is there an issue near this point" probes only the few cells around the
+point with `cell_y IN (...) AND cell_x BETWEEN ...` and never scans a table
+range, however many hotspots there are.
+
+Each issue type counted in a committed survey is merged into the nearest
+hotspot of that type within HOTSPOT_RADIUS_M (its centre moves to the mean
+position of its surveys), or starts a new one. Hotspots keep survey and
+detection counts, first/last seen and the maximum severity.
+"""
+
+import os
+import math
+import threading
+
+from novelty import distance_m
+from storage import get_connection, ISSUE_COLUMNS, SEVERITY_WEIGHTS
+
+HOTSPOT_RADIUS_M = float(os.getenv('HOTSPOT_RADIUS_M', 10))
+HOTSPOT_CELL_M = float(os.getenv('HOTSPOT_CELL_M', 10))
+HOTSPOT_MAX_RADIUS_M = float(os.getenv('HOTSPOT_MAX_RADIUS_M', 1000))
+
+METRES_PER_DEGREE = 111320.0
+CELL_DEGREES = HOTSPOT_CELL_M / METRES_PER_DEGREE
+
+HOTSPOT_COLUMNS = ["id", "issue_type", "latitude", "longitude", "surveys", "detections",
+                   "max_severity", "first_seen", "last_seen"]
+
+
+def cell_of(latitude, longitude):
+    """(cell_y, cell_x) grid cell of a point"""
+    return math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES)
+
+
+def nearby_cells(latitude, longitude, radius_m):
+    """(rows, (min_x, max_x)) of the cells that can hold points within radius_m"""
+    cell_y, cell_x = cell_of(latitude, longitude)
+    reach_y = math.ceil(radius_m / HOTSPOT_CELL_M)
+    # A cell is narrower than HOTSPOT_CELL_M in metres away from the equator
+    width_m = HOTSPOT_CELL_M * max(math.cos(math.radians(latitude)), 0.01)
+    reach_x = math.ceil(radius_m / width_m)
+    return list(range(cell_y - reach_y, cell_y + reach_y + 1)), (cell_x - reach_x, cell_x + reach_x)
+
+
+def init_hotspots(conn):
+    """Create the hotspot table; returns True if it did not exist yet"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                          "AND name = 'hotspots'").fetchone()
+    conn.execute('''CREATE TABLE IF NOT EXISTS hotspots
+                 (id INTEGER PRIMARY KEY, issue_type TEXT NOT NULL, cell_y INTEGER NOT NULL,
+                  cell_x INTEGER NOT NULL, latitude REAL NOT NULL, longitude REAL NOT NULL,
+                  surveys INTEGER NOT NULL, detections INTEGER NOT NULL, max_severity REAL NOT NULL,
+                  first_seen TEXT, last_seen TEXT)''')
+    # Nearby lookups
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hotspots_cell ON hotspots (issue_type, cell_y, cell_x)")
+    # Bounding-box listings
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_hotspots_lat_lng ON hotspots (latitude, longitude)")
+    conn.commit()
+    return not exists
+
+
+def _as_dict(row, latitude=None, longitude=None):
+    hotspot = dict(zip(HOTSPOT_COLUMNS, row))
+    if latitude is not None:
+        hotspot["distance_m"] = round(distance_m(latitude, longitude, hotspot["latitude"],
+                                                 hotspot["longitude"]), 2)
+    return hotspot
+
+
+def find_nearby(conn, latitude, longitude, radius_m=HOTSPOT_RADIUS_M, issue_types=None):
+    """Hotspots within radius_m of a point, nearest first"""
+    radius_m = min(radius_m, HOTSPOT_MAX_RADIUS_M)
+    issue_types = issue_types or ISSUE_COLUMNS
+    rows, (min_x, max_x) = nearby_cells(latitude, longitude, radius_m)
+    candidates = conn.execute(
+        f"SELECT {', '.join(HOTSPOT_COLUMNS)} FROM hotspots "
+        f"WHERE issue_type IN ({', '.join('?' for _ in issue_types)}) "
+        f"AND cell_y IN ({', '.join('?' for _ in rows)}) AND cell_x BETWEEN ? AND ?",
+        [*issue_types, *rows, min_x, max_x]).fetchall()
+
+    hotspots = [_as_dict(row, latitude, longitude) for row in candidates]
+    hotspots = [hotspot for hotspot in hotspots if hotspot["distance_m"] <= radius_m]
+    hotspots.sort(key=lambda hotspot: hotspot["distance_m"])
+    return hotspots
+
+
+def list_hotspots(conn, bbox=None, issue_type=None, min_surveys=1, limit=500):
+    """Hotspots inside bbox (min_lng, min_lat, max_lng, max_lat), most surveyed first"""
+    where, params = ["surveys >= ?"], [min_surveys]
+    if bbox is not None:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        where.append("latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?")
+        params += [min_lat, max_lat, min_lng, max_lng]
+    if issue_type is not None:
+        where.append("issue_type = ?")
+        params.append(issue_type)
+    rows = conn.execute(f"SELECT {', '.join(HOTSPOT_COLUMNS)} FROM hotspots WHERE {' AND '.join(where)} "
+                        f"ORDER BY surveys DESC, max_severity DESC LIMIT ?", [*params, limit]).fetchall()
+    return [_as_dict(row) for row in rows]
+
+
+def merge_survey(conn, row):
+    """Merge every issue type counted in one survey row into its hotspot"""
+    latitude, longitude = row.get("latitude"), row.get("longitude")
+    if latitude is None or longitude is None:
+        return 0
+
+    merged = 0
+    for issue_type in ISSUE_COLUMNS:
+        count = row.get(issue_type) or 0
+        if count <= 0:
+            continue
+        severity = count * SEVERITY_WEIGHTS.get(issue_type, 1.0)
+        timestamp = row.get("timestamp")
+
+        nearest = find_nearby(conn, latitude, longitude, HOTSPOT_RADIUS_M, [issue_type])
+        if nearest:
+            hotspot = nearest[0]
+            surveys = hotspot["surveys"] + 1
+            # Centre is the mean position of the hotspot's surveys
+            new_latitude = hotspot["latitude"] + (latitude - hotspot["latitude"]) / surveys
+            new_longitude = hotspot["longitude"] + (longitude - hotspot["longitude"]) / surveys
+            cell_y, cell_x = cell_of(new_latitude, new_longitude)
+            conn.execute('''UPDATE hotspots SET cell_y = ?, cell_x = ?, latitude = ?, longitude = ?,
+                                surveys = ?, detections = detections + ?, max_severity = MAX(max_severity, ?),
+                                first_seen = MIN(COALESCE(first_seen, ?), ?),
+                                last_seen = MAX(COALESCE(last_seen, ?), ?)
+                            WHERE id = ?''',
+                         (cell_y, cell_x, new_latitude, new_longitude, surveys, count, severity,
+                          timestamp, timestamp, timestamp, timestamp, hotspot["id"]))
+        else:
+            cell_y, cell_x = cell_of(latitude, longitude)
+            conn.execute('''INSERT INTO hotspots (issue_type, cell_y, cell_x, latitude, longitude, surveys,
+                                detections, max_severity, first_seen, last_seen)
+                            VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?)''',
+                         (issue_type, cell_y, cell_x, latitude, longitude, count, severity,
+                          timestamp, timestamp))
+        merged += 1
+    return merged
+
+
+class HotspotIndex:
+    """Merges committed surveys into hotspots (storage insert listener)"""
+
+    def __init__(self):
+        # Serialises merges, so concurrent batches cannot both create the
+        # same hotspot
+        self.lock = threading.Lock()
+        self.merged = 0
+
+    def init_db(self):
+        with get_connection() as conn:
+            if init_hotspots(conn):
+                # Existing database from before hotspots
+                self.rebuild(conn)
+
+    def merge_surveys(self, rows):
+        """storage insert listener"""
+        # Connection before lock, the same order as rebuild(conn)
+        with get_connection() as conn, self.lock:
+            with conn:
+                for row in rows:
+                    self.merged += merge_survey(conn, row)
+
+    def rebuild(self, conn=None, chunk_size=5000):
+        """Recompute all hotspots from surveys, returns the number of hotspots"""
+        if conn is None:
+            with get_connection() as conn:
+                return self.rebuild(conn, chunk_size)
+
+        columns = ["id", "timestamp", "latitude", "longitude", *ISSUE_COLUMNS]
+        with self.lock, conn:
+            conn.execute("DELETE FROM hotspots")
+            last_id = 0
+            while True:
+                rows = conn.execute(f"SELECT {', '.join(columns)} FROM surveys WHERE id > ? "
+                                    f"ORDER BY id LIMIT ?", (last_id, chunk_size)).fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    merge_survey(conn, dict(zip(columns, row)))
+                last_id = rows[-1][0]
+        return conn.execute("SELECT COUNT(*) FROM hotspots").fetchone()[0]
+
+    def get_stats(self, conn):
+        hotspots, surveys = conn.execute("SELECT COUNT(*), COALESCE(SUM(surveys), 0) FROM hotspots").fetchone()
+        by_type = conn.execute("SELECT issue_type, COUNT(*) FROM hotspots GROUP BY issue_type").fetchall()
+        return {
+            "hotspots": hotspots,
+            "merged_surveys": surveys,
+            "merged_since_start": self.merged,
+            "by_type": dict(by_type),
+            "radius_m": HOTSPOT_RADIUS_M,
+            "cell_m": HOTSPOT_CELL_M,
+        }
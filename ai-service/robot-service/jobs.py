@@ -0,0 +1,164 @@
+"""
+Background job queue for robot frames.
+
+/robot/submit only enqueues a frame and returns a job id; a fixed pool of
+worker threads runs detection and stores the survey. The queue is bounded:
+when it is full, submit() raises QueueFull with a Retry-After estimate so
+robots back off instead of piling up requests.
+
+With `partition` set, jobs with the same payload value (a robot id) always
+go to the same worker and run in submission order; frame N+1 of a robot
+never overtakes frame N.
+"""
+
+import os
+import time
+import uuid
+import zlib
+import queue
+import threading
+from collections import OrderedDict, deque
+
+ROBOT_JOB_WORKERS = int(os.getenv('ROBOT_JOB_WORKERS', 4))
+ROBOT_JOB_QUEUE_SIZE = int(os.getenv('ROBOT_JOB_QUEUE_SIZE', 256))
+# Finished jobs stay queryable for this many seconds
+ROBOT_JOB_TTL = int(os.getenv('ROBOT_JOB_TTL', 600))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """
+    Bounded queue + worker threads running handler(**payload).
+
+    Job state is kept in memory: {"job_id", "status", "submitted_at",
+    "started_at", "finished_at", "result", "error"}.
+    """
+
+    def __init__(self, handler, workers=ROBOT_JOB_WORKERS, max_queued=ROBOT_JOB_QUEUE_SIZE,
+                 result_ttl=ROBOT_JOB_TTL, name="robot-job", partition=None):
+        self.handler = handler
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.name = name
+        self.partition = partition
+        self.max_queued = max_queued
+        if partition is None:
+            # One queue shared by all workers
+            self.queues = [queue.Queue(maxsize=max_queued)]
+        else:
+            # One queue per worker, the capacity split between them
+            size = max(1, -(-max_queued // workers))
+            self.queues = [queue.Queue(maxsize=size) for _ in range(workers)]
+        self.jobs = OrderedDict()
+        self.durations = deque(maxlen=100)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            pending = self.queues[i % len(self.queues)]
+            thread = threading.Thread(target=self._run, args=(pending,), name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely free, from recent job durations"""
+        with self.lock:
+            average = sum(self.durations) / len(self.durations) if self.durations else 1.0
+        return max(1, int(round(self.queued() * average / max(self.workers, 1))))
+
+    def queued(self):
+        return sum(pending.qsize() for pending in self.queues)
+
+    def _queue_for(self, payload):
+        if self.partition is None:
+            return self.queues[0]
+        key = str(payload.get(self.partition)).encode()
+        return self.queues[zlib.crc32(key) % len(self.queues)]
+
+    def submit(self, **payload):
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": QUEUED,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+        try:
+            self._queue_for(payload).put_nowait((job_id, payload))
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job_id]
+                self.rejected += 1
+            raise QueueFull(self.retry_after())
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self, now):
+        # Jobs finish roughly in submission order; stop at the first one to keep
+        while self.jobs:
+            job = next(iter(self.jobs.values()))
+            if job["finished_at"] is None or now - job["finished_at"] < self.result_ttl:
+                break
+            self.jobs.popitem(last=False)
+
+    def _run(self, pending):
+        while True:
+            job_id, payload = pending.get()
+            with self.lock:
+                job = self.jobs[job_id]
+                job["status"] = RUNNING
+                job["started_at"] = time.time()
+
+            try:
+                result, error = self.handler(**payload), None
+            except Exception as e:
+                result, error = None, str(e)
+
+            now = time.time()
+            with self.lock:
+                job.update(status=FAILED if error else DONE, result=result, error=error, finished_at=now)
+                self.durations.append(now - job["started_at"])
+                if error:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                self._prune(now)
+
+    def get_stats(self):
+        with self.lock:
+            durations = list(self.durations)
+            running = sum(1 for job in self.jobs.values() if job["status"] == RUNNING)
+            return {
+                "workers": self.workers,
+                "queued": self.queued(),
+                "max_queued": self.max_queued,
+                "running": running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_job_seconds": round(sum(durations) / len(durations), 3) if durations else None,
+            }
@@ -0,0 +1,128 @@
+"""
+Local stand-in for the hosted Roboflow inference API.
+
+Speaks the hosted (v0) protocol used by HostedDetector:
+POST /<project>/<version>?api_key=... with a base64 encoded image as body.
+Point the robot service at it to load-test without network access:
+
+    python mock_roboflow.py --port 9001 --latency-ms 300 --failure-rate 0.05
+    ROBOFLOW_API_URL=http://localhost:9001 python app.py
+
+--backend synthetic returns deterministic fake boxes (default),
+--backend local runs the real local YOLOv8 models (LocalYOLODetector).
+"""
+
+import argparse
+import base64
+import hashlib
+import random
+import time
+
+import cv2
+import numpy as np
+from flask import Flask, request, jsonify
+
+from detectors import LocalYOLODetector
+
+app = Flask(__name__)
+
+SETTINGS = {
+    "backend": "synthetic",
+    "latency_ms": 0.0,
+    "jitter_ms": 0.0,
+    "failure_rate": 0.0,
+}
+
+CLASSES = {
+    "pothole-clzln": ["pothole"],
+    "garbage-yzrfd": ["garbage"],
+    "manhole-e0p0b": ["open_manhole", "broken_manhole"],
+    "damaged-roads-detector": ["crack", "damaged_road"],
+    "visual-pollution-3": ["construction_debris", "graffiti", "billboard"],
+    "stray-animals-xnyc0": ["cow", "dog"],
+    "water-leakage": ["water_leakage"],
+}
+
+local_detector = None
+
+
+def synthetic_predictions(image_bytes, project, width, height):
+    """Deterministic boxes derived from the image hash, so repeated frames agree"""
+    rng = random.Random(hashlib.sha256(image_bytes + project.encode()).digest())
+    classes = CLASSES.get(project, ["object"])
+
+    predictions = []
+    for _ in range(rng.randint(0, 3)):
+        w = rng.uniform(0.05, 0.4) * width
+        h = rng.uniform(0.05, 0.4) * height
+        predictions.append({
+            "x": rng.uniform(w / 2, width - w / 2),
+            "y": rng.uniform(h / 2, height - h / 2),
+            "width": w,
+            "height": h,
+            "confidence": round(rng.uniform(0.3, 0.99), 3),
+            "class": rng.choice(classes),
+        })
+    return predictions
+
+
+@app.route("/<project>/<version>", methods=["POST"])
+def infer(project, version):
+    started = time.time()
+
+    delay = SETTINGS["latency_ms"] + random.uniform(-1, 1) * SETTINGS["jitter_ms"]
+    if delay > 0:
+        time.sleep(delay / 1000)
+
+    if random.random() < SETTINGS["failure_rate"]:
+        return jsonify({"message": "Simulated model failure"}), 500
+
+    try:
+        image_bytes = base64.b64decode(request.get_data())
+        image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except Exception:
+        image = None
+    if image is None:
+        return jsonify({"message": "Could not decode image"}), 400
+
+    height, width = image.shape[:2]
+    model_id = f"{project}/{version}"
+
+    if SETTINGS["backend"] == "local":
+        predictions = local_detector.infer(image, model_id)["predictions"]
+    else:
+        predictions = synthetic_predictions(image_bytes, project, width, height)
+
+    return jsonify({
+        "time": time.time() - started,
+        "image": {"width": width, "height": height},
+        "predictions": predictions,
+    })
+
+
+def main():
+    global local_detector
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the Roboflow inference API")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--backend", choices=["synthetic", "local"], default="synthetic")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    SETTINGS.update(
+        backend=args.backend,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+    )
+    if args.backend == "local":
+        local_detector = LocalYOLODetector()
+
+    print(f"🧪 Roboflow stand-in ({args.backend}) on port {args.port}...")
+    app.run(host="0.0.0.0", port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
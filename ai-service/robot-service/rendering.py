@@ -0,0 +1,87 @@
+"""
+Detection result rendering.
+
+Draws Roboflow-format predictions (x/y are box centres) onto a BGR image in
+a single pass: every translucent box fill goes onto one overlay that is
+blended once, over the region the boxes cover, instead of copying and
+blending the whole image for every prediction. Label text sizes are cached.
+"""
+
+from functools import lru_cache
+
+import cv2
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.6
+FONT_THICKNESS = 2
+
+STYLES = {
+    # /detect: translucent fill, white label with a coloured border
+    "detect": {"fill_alpha": 0.2, "label_background": (255, 255, 255), "label_border": True},
+    # Robot scans: outline only, label on the box colour
+    "robot": {"fill_alpha": 0.0, "label_background": None, "label_border": False,
+              "color": (0, 255, 0)},
+}
+
+
+@lru_cache(maxsize=4096)
+def label_size(label):
+    """(width, height) of a label in the renderer's font"""
+    return cv2.getTextSize(label, FONT, FONT_SCALE, FONT_THICKNESS)[0]
+
+
+def _boxes(predictions, color_for, default_color):
+    boxes = []
+    for pred in predictions:
+        x = int(pred["x"] - pred["width"] / 2)
+        y = int(pred["y"] - pred["height"] / 2)
+        w = int(pred["width"])
+        h = int(pred["height"])
+        color = color_for(pred) if color_for else default_color
+        boxes.append((x, y, w, h, color, f"{pred['class']} {pred['confidence']:.2f}"))
+    return boxes
+
+
+def _blend_fills(image, boxes, alpha):
+    """Blend all box fills at once, limited to the union of the boxes"""
+    height, width = image.shape[:2]
+    x0 = max(min(x for x, _, _, _, _, _ in boxes), 0)
+    y0 = max(min(y for _, y, _, _, _, _ in boxes), 0)
+    x1 = min(max(x + w for x, _, w, _, _, _ in boxes), width)
+    y1 = min(max(y + h for _, y, _, h, _, _ in boxes), height)
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    region = image[y0:y1, x0:x1]
+    overlay = region.copy()
+    for x, y, w, h, color, _ in boxes:
+        cv2.rectangle(overlay, (x - x0, y - y0), (x - x0 + w, y - y0 + h), color, -1)
+    image[y0:y1, x0:x1] = cv2.addWeighted(overlay, alpha, region, 1 - alpha, 0)
+
+
+def render_detections(image, predictions, color_for=None, style="detect"):
+    """
+    Draw predictions onto image in place and return it.
+
+    color_for(pred) picks a BGR colour per prediction (the style's colour
+    if not given).
+    """
+    options = STYLES[style]
+    boxes = _boxes(predictions, color_for, options.get("color", (0, 255, 0)))
+    if not boxes:
+        return image
+
+    if options["fill_alpha"] > 0:
+        _blend_fills(image, boxes, options["fill_alpha"])
+
+    for x, y, w, h, color, label in boxes:
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, 2)
+
+        label_w, label_h = label_size(label)
+        background = options["label_background"] or color
+        cv2.rectangle(image, (x, y - label_h - 10), (x + label_w + 10, y), background, -1)
+        if options["label_border"]:
+            cv2.rectangle(image, (x, y - label_h - 10), (x + label_w + 10, y), color, 2)
+        cv2.putText(image, label, (x + 5, y - 5), FONT, FONT_SCALE, (0, 0, 0), FONT_THICKNESS)
+
+    return image
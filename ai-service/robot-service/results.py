@@ -0,0 +1,156 @@
+"""
+Lazily rendered detection result images.
+
+Detection requests only store a render record (original image path +
+predictions + style); the annotated JPEG is drawn the first time
+/results/<name> is requested and kept in RESULTS_DIR, where an LRU evicts
+the least recently served images once RESULT_CACHE_MAX_MB is exceeded.
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import cv2
+
+from detectors import DECODE_FLAGS
+from rendering import render_detections
+from storage import get_connection
+
+RESULTS_DIR = os.getenv('RESULTS_DIR', 'static/results')
+RESULT_CACHE_MAX_MB = float(os.getenv('RESULT_CACHE_MAX_MB', 256))
+RESULT_JPEG_QUALITY = int(os.getenv('RESULT_JPEG_QUALITY', 90))
+
+
+def result_url(name):
+    return f"/results/{name}"
+
+
+class ResultImages:
+    """
+    Render records in the result_renders table, rendered images on disk.
+
+    colors maps a prediction's model_type to its BGR colour for the
+    "detect" style.
+    """
+
+    def __init__(self, colors, root=RESULTS_DIR, max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024):
+        self.colors = colors
+        # Absolute: send_file resolves relative paths against the app root,
+        # not the working directory the images are rendered to
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+        self.evicted = 0
+
+        os.makedirs(root, exist_ok=True)
+        # Files already on disk, least recently used first
+        self.entries = OrderedDict()
+        files = [entry for entry in os.scandir(root) if entry.is_file() and not entry.name.endswith('.tmp')]
+        for entry in sorted(files, key=lambda entry: entry.stat().st_atime):
+            self.entries[entry.name] = entry.stat().st_size
+        self.total_bytes = sum(self.entries.values())
+
+    def init_db(self):
+        with get_connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS result_renders
+                            (name TEXT PRIMARY KEY, source_path TEXT, predictions TEXT,
+                             style TEXT, created_at TEXT)''')
+            conn.commit()
+
+    def record(self, name, source_path, predictions, style="detect"):
+        """Store what is needed to render `name` later, returns its URL"""
+        return self.record_many([(name, source_path, predictions)], style)[0]
+
+    def record_many(self, records, style="detect"):
+        """record() for [(name, source_path, predictions)] in one transaction, returns their URLs"""
+        created_at = datetime.now().isoformat()
+        with get_connection() as conn:
+            conn.executemany('INSERT OR REPLACE INTO result_renders VALUES (?, ?, ?, ?, ?)',
+                             [(name, source_path, json.dumps(predictions), style, created_at)
+                              for name, source_path, predictions in records])
+            conn.commit()
+        # A re-recorded name (same robot image scanned again) is rendered afresh
+        for name, _, _ in records:
+            self._discard(name)
+        return [result_url(name) for name, _, _ in records]
+
+    def path_for(self, name):
+        return os.path.join(self.root, os.path.basename(name))
+
+    def get(self, name):
+        """Path of the rendered image, rendering it first if needed; None if unknown"""
+        path = self.path_for(name)
+        with self.lock:
+            if name in self.entries and os.path.exists(path):
+                self.entries.move_to_end(name)
+                self.hits += 1
+                return path
+
+        with get_connection() as conn:
+            row = conn.execute('SELECT source_path, predictions, style FROM result_renders WHERE name = ?',
+                               (name,)).fetchone()
+        if row is None:
+            return None
+
+        source_path, predictions, style = row
+        image = cv2.imread(source_path, DECODE_FLAGS)
+        if image is None:
+            return None
+
+        color_for = None
+        if style == "detect":
+            color_for = lambda pred: self.colors.get(pred.get("model_type"), (0, 255, 0))
+        render_detections(image, json.loads(predictions), color_for=color_for, style=style)
+
+        ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, RESULT_JPEG_QUALITY])
+        if not ok:
+            return None
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.tobytes())
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.total_bytes += len(buffer) - self.entries.pop(name, 0)
+            self.entries[name] = len(buffer)
+            self.renders += 1
+            self._evict()
+        return path
+
+    def _evict(self):
+        # Keep the image just rendered even if it alone exceeds the budget
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            name, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evicted += 1
+            try:
+                os.remove(self.path_for(name))
+            except FileNotFoundError:
+                pass
+
+    def _discard(self, name):
+        with self.lock:
+            size = self.entries.pop(name, None)
+            if size is None:
+                return
+            self.total_bytes -= size
+        try:
+            os.remove(self.path_for(name))
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "cached_images": len(self.entries),
+                "cached_mb": round(self.total_bytes / 1024 / 1024, 2),
+                "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+                "hits": self.hits,
+                "renders": self.renders,
+                "evicted": self.evicted,
+            }
@@ -0,0 +1,76 @@
+"""
+Robot simulation runner.
+
+Runs the robot pipeline over a whole directory of test images (optionally
+a recursive dataset) as a load test. Inference runs on a bounded pool of
+SIMULATE_WORKERS threads with at most two images per worker in flight, and
+results come back in directory order, so memory stays flat for any dataset
+size and the cross-frame tracker sees the images as a sequence. Progress
+is streamed to clients as server-sent events.
+"""
+
+import os
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+SIMULATE_DIR = os.getenv('SIMULATE_DIR', 'test_images')
+SIMULATE_WORKERS = int(os.getenv('SIMULATE_WORKERS', 8))
+SIMULATE_MAX_WORKERS = int(os.getenv('SIMULATE_MAX_WORKERS', 32))
+# Surveys and render records are committed every SIMULATE_BATCH_SIZE images
+SIMULATE_BATCH_SIZE = int(os.getenv('SIMULATE_BATCH_SIZE', 50))
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def find_images(root, recursive=False, limit=None):
+    """Image paths under root, relative to it and sorted"""
+    if not recursive:
+        names = sorted(name for name in os.listdir(root)
+                       if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(os.path.join(root, name)))
+        return names[:limit] if limit else names
+
+    paths = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        relative = os.path.relpath(directory, root)
+        paths.extend(name if relative == '.' else os.path.join(relative, name)
+                     for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS))
+        if limit and len(paths) >= limit:
+            return paths[:limit]
+    return paths
+
+
+def run_ordered(fn, items, workers=SIMULATE_WORKERS):
+    """
+    Yield (item, result, error) for fn(item) over items, in order, with
+    at most 2 * workers calls submitted but not yet yielded.
+    """
+    items = iter(items)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="robot-simulate") as executor:
+        try:
+            for item in items:
+                pending.append((item, executor.submit(fn, item)))
+                if len(pending) >= workers * 2:
+                    break
+
+            while pending:
+                item, future = pending.popleft()
+                try:
+                    result, error = future.result(), None
+                except Exception as e:
+                    result, error = None, e
+                next_item = next(items, None)
+                if next_item is not None:
+                    pending.append((next_item, executor.submit(fn, next_item)))
+                yield item, result, error
+        finally:
+            # Client went away: do not start the images still queued
+            for _, future in pending:
+                future.cancel()
+
+
+def format_event(event, data):
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,562 @@
+"""
+SQLite storage for the robot service.
+
+- Connections come from a pool instead of a sqlite3.connect per request
+- WAL journaling, so dashboard reads do not block robot writes
+- SurveyWriter buffers survey inserts and commits them in batches
+  (write-behind), one transaction per batch instead of one per survey
+- Per-source totals and severity buckets are maintained by triggers, so the
+  stats endpoints do not scan the surveys table
+- Every prediction behind a survey is kept in the detections table (class,
+  confidence, box, position), written in the survey's transaction
+"""
+
+import os
+import json
+import queue
+import atexit
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DB_PATH = os.getenv('ROBOT_DB_PATH', 'road_survey.db')
+DB_POOL_SIZE = int(os.getenv('ROBOT_DB_POOL_SIZE', 8))
+SURVEY_BATCH_SIZE = int(os.getenv('SURVEY_BATCH_SIZE', 200))
+SURVEY_FLUSH_INTERVAL = float(os.getenv('SURVEY_FLUSH_INTERVAL', 0.5))
+SURVEY_WRITE_RETRIES = int(os.getenv('SURVEY_WRITE_RETRIES', 3))
+
+ISSUE_COLUMNS = ["potholes", "garbage", "manholes", "damaged_roads",
+                 "construction_debris", "stray_animals", "water_leakage", "visual_pollution"]
+SURVEY_COLUMNS = ["timestamp", "latitude", "longitude", *ISSUE_COLUMNS,
+                  "total_issues", "severity_score", "description", "report_type", "source",
+                  "result_image"]
+
+# Road damage weighs more in the severity score
+SEVERITY_WEIGHTS = {"potholes": 1.5, "damaged_roads": 1.5}
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",   # durable at checkpoints, safe with WAL
+    "PRAGMA cache_size=-16000",    # 16 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+def connect(path=None):
+    """Open a connection with the service's PRAGMAs applied"""
+    conn = sqlite3.connect(path or DB_PATH, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of connections.
+
+    Flask's threaded server uses a new thread per request, so thread-local
+    connections would not be reused; connections are checked out and
+    returned instead. Each connection is used by one thread at a time.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.created = 0
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                return connect(self.path)
+
+        return self.idle.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.idle.put(conn)
+
+
+pool = ConnectionPool(DB_PATH, DB_POOL_SIZE)
+
+
+def get_connection():
+    """`with get_connection() as conn:` - borrow a pooled connection"""
+    return pool.connection()
+
+
+# Aggregates kept up to date by triggers on surveys, so the stats endpoints
+# read a handful of rows instead of scanning the whole table.
+AGGREGATE_COLUMNS = [*ISSUE_COLUMNS, "total_issues"]
+
+SEVERITY_LEVEL_SQL = """CASE
+                            WHEN {0}.severity_score <= 2 THEN 'Low'
+                            WHEN {0}.severity_score <= 5 THEN 'Medium'
+                            WHEN {0}.severity_score <= 10 THEN 'High'
+                            ELSE 'Critical'
+                        END"""
+
+
+def _aggregate_statements(row, sign):
+    """Statements adding (sign '+') or removing (sign '-') one surveys row from the aggregates"""
+    source = f"COALESCE({row}.source, '')"
+    level = SEVERITY_LEVEL_SQL.format(row)
+    totals = ", ".join(f"{column} = {column} {sign} COALESCE({row}.{column}, 0)"
+                       for column in AGGREGATE_COLUMNS)
+    return f"""
+        INSERT OR IGNORE INTO survey_totals (source) VALUES ({source});
+        UPDATE survey_totals SET surveys = surveys {sign} 1, {totals},
+            severity_sum = severity_sum {sign} COALESCE({row}.severity_score, 0)
+            WHERE source = {source};
+        INSERT OR IGNORE INTO severity_counts (source, level) VALUES ({source}, {level});
+        UPDATE severity_counts SET count = count {sign} 1
+            WHERE source = {source} AND level = {level};"""
+
+
+INDEXES = (
+    # Recent surveys, overall and per source
+    "CREATE INDEX IF NOT EXISTS idx_surveys_timestamp ON surveys (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_surveys_source_timestamp ON surveys (source, timestamp)",
+    # Heatmap bounding-box queries
+    "CREATE INDEX IF NOT EXISTS idx_surveys_lat_lng ON surveys (latitude, longitude)",
+    # Robot class distribution: partial and covering, so it reads only the
+    # surveys with visual pollution and never touches the table
+    "CREATE INDEX IF NOT EXISTS idx_surveys_source_pollution ON surveys "
+    "(source, description, visual_pollution) WHERE visual_pollution > 0",
+)
+
+
+DETECTION_COLUMNS = ["survey_id", "model_key", "class", "confidence", "x", "y", "width", "height",
+                     "track_id", "latitude", "longitude", "timestamp"]
+
+DETECTION_INDEXES = (
+    # "all manholes above 0.8 confidence", per class or per model
+    "CREATE INDEX IF NOT EXISTS idx_detections_class_confidence ON detections (class, confidence)",
+    "CREATE INDEX IF NOT EXISTS idx_detections_model_confidence ON detections (model_key, confidence)",
+    # Bounding-box queries
+    "CREATE INDEX IF NOT EXISTS idx_detections_lat_lng ON detections (latitude, longitude)",
+    "CREATE INDEX IF NOT EXISTS idx_detections_survey ON detections (survey_id)",
+)
+
+
+def create_aggregates(conn):
+    """Aggregate tables and the triggers that maintain them"""
+    columns = ", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in AGGREGATE_COLUMNS)
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS survey_totals
+            (source TEXT PRIMARY KEY, surveys INTEGER NOT NULL DEFAULT 0, {columns},
+             severity_sum REAL NOT NULL DEFAULT 0);
+        CREATE TABLE IF NOT EXISTS severity_counts
+            (source TEXT, level TEXT, count INTEGER NOT NULL DEFAULT 0,
+             PRIMARY KEY (source, level));
+
+        CREATE TRIGGER IF NOT EXISTS surveys_aggregate_insert AFTER INSERT ON surveys
+        BEGIN {_aggregate_statements("NEW", "+")}
+        END;
+        CREATE TRIGGER IF NOT EXISTS surveys_aggregate_delete AFTER DELETE ON surveys
+        BEGIN {_aggregate_statements("OLD", "-")}
+        END;
+        CREATE TRIGGER IF NOT EXISTS surveys_aggregate_update AFTER UPDATE ON surveys
+        BEGIN {_aggregate_statements("OLD", "-")} {_aggregate_statements("NEW", "+")}
+        END;
+    """)
+
+
+def rebuild_aggregates(conn=None):
+    """Recompute the aggregate tables from surveys, returns the number of surveys counted"""
+    if conn is None:
+        with get_connection() as conn:
+            return rebuild_aggregates(conn)
+
+    sums = ", ".join(f"COALESCE(SUM({column}), 0)" for column in AGGREGATE_COLUMNS)
+    with conn:
+        conn.execute("DELETE FROM survey_totals")
+        conn.execute("DELETE FROM severity_counts")
+        conn.execute(f"""INSERT INTO survey_totals
+                             (source, surveys, {", ".join(AGGREGATE_COLUMNS)}, severity_sum)
+                         SELECT COALESCE(source, ''), COUNT(*), {sums}, COALESCE(SUM(severity_score), 0)
+                         FROM surveys GROUP BY COALESCE(source, '')""")
+        conn.execute(f"""INSERT INTO severity_counts (source, level, count)
+                         SELECT COALESCE(source, ''), {SEVERITY_LEVEL_SQL.format("surveys")}, COUNT(*)
+                         FROM surveys GROUP BY 1, 2""")
+    return conn.execute("SELECT COALESCE(SUM(surveys), 0) FROM survey_totals").fetchone()[0]
+
+
+def get_totals(conn, source=None):
+    """Aggregated counts for one source (or all of them) as a dict"""
+    columns = ["surveys", *AGGREGATE_COLUMNS, "severity_sum"]
+    where, params = ("WHERE source = ?", (source,)) if source is not None else ("", ())
+    row = conn.execute(f"SELECT {', '.join(f'COALESCE(SUM({column}), 0)' for column in columns)} "
+                       f"FROM survey_totals {where}", params).fetchone()
+    totals = dict(zip(columns, row))
+    totals["avg_severity"] = totals["severity_sum"] / totals["surveys"] if totals["surveys"] else 0
+    return totals
+
+
+def get_severity_counts(conn, source=None):
+    """[(level, count)] from the severity aggregate, levels without surveys left out"""
+    where, params = ("AND source = ?", (source,)) if source is not None else ("", ())
+    return conn.execute(f"SELECT level, SUM(count) FROM severity_counts WHERE count > 0 {where} "
+                        f"GROUP BY level", params).fetchall()
+
+
+def init_db():
+    with get_connection() as conn:
+        conn.execute('''CREATE TABLE IF NOT EXISTS surveys
+                     (id INTEGER PRIMARY KEY, timestamp TEXT, latitude REAL, longitude REAL,
+                      potholes INTEGER, garbage INTEGER, manholes INTEGER, damaged_roads INTEGER,
+                      construction_debris INTEGER, stray_animals INTEGER, water_leakage INTEGER,
+                      visual_pollution INTEGER, total_issues INTEGER, severity_score REAL,
+                      description TEXT, report_type TEXT, source TEXT, result_image TEXT)''')
+
+        # Databases from before surveys were linked to their result image
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(surveys)")]
+        if "result_image" not in columns:
+            conn.execute("ALTER TABLE surveys ADD COLUMN result_image TEXT")
+
+        for index in INDEXES:
+            conn.execute(index)
+        conn.commit()
+
+        has_aggregates = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                                      "AND name = 'survey_totals'").fetchone()
+        create_aggregates(conn)
+        if not has_aggregates:
+            # Existing database from before the aggregate tables
+            rebuild_aggregates(conn)
+
+        has_detections = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                                      "AND name = 'detections'").fetchone()
+        conn.execute('''CREATE TABLE IF NOT EXISTS detections
+                     (id INTEGER PRIMARY KEY, survey_id INTEGER NOT NULL, model_key TEXT, class TEXT,
+                      confidence REAL, x REAL, y REAL, width REAL, height REAL, track_id TEXT,
+                      latitude REAL, longitude REAL, timestamp TEXT)''')
+        for index in DETECTION_INDEXES:
+            conn.execute(index)
+        conn.execute('''CREATE TRIGGER IF NOT EXISTS surveys_detections_delete AFTER DELETE ON surveys
+                        BEGIN DELETE FROM detections WHERE survey_id = OLD.id; END''')
+        conn.commit()
+        if not has_detections:
+            # Existing database from before per-detection storage
+            backfill_detections(conn)
+
+
+def backfill_detections(conn=None, default_model_key="visual_pollution"):
+    """
+    Recover detections of surveys that have none from their result image
+    record (result_renders), returns the number of detections added.
+
+    Only surveys with a result image can be backfilled: the others only ever
+    stored counts. Robot render records have no "model_type", their
+    predictions came from default_model_key. A tracked robot survey only
+    counted its new tracks (visual_pollution) while the render has every
+    prediction of the frame; which ones were new is not recorded, so the
+    most confident `count` predictions are kept to match the survey.
+    """
+    if conn is None:
+        with get_connection() as conn:
+            return backfill_detections(conn, default_model_key)
+
+    has_renders = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                               "AND name = 'result_renders'").fetchone()
+    if not has_renders:
+        return 0
+
+    rows = conn.execute('''SELECT s.id, s.latitude, s.longitude, s.timestamp, s.visual_pollution,
+                                  r.style, r.predictions
+                           FROM surveys s JOIN result_renders r ON r.name = s.result_image
+                           WHERE NOT EXISTS (SELECT 1 FROM detections d WHERE d.survey_id = s.id)''').fetchall()
+    added = 0
+    with conn:
+        for survey_id, latitude, longitude, timestamp, count, style, predictions in rows:
+            try:
+                predictions = json.loads(predictions)
+            except (TypeError, ValueError):
+                continue
+            if style == "robot":
+                predictions = sorted(predictions, key=lambda prediction: prediction.get("confidence") or 0,
+                                     reverse=True)[:count or 0]
+            row = {"latitude": latitude, "longitude": longitude, "timestamp": timestamp}
+            values = _detection_values(survey_id, row, detection_rows(predictions, default_model_key))
+            conn.executemany(INSERT_DETECTION_SQL, values)
+            added += len(values)
+    return added
+
+
+def query_detections(conn, cls=None, model_key=None, min_confidence=None, bbox=None,
+                     since=None, limit=500):
+    """
+    Detections matching every given filter, most confident first; bbox is
+    (min_lng, min_lat, max_lng, max_lat), since an ISO timestamp
+    """
+    where, params = [], []
+    if cls is not None:
+        where.append("class = ?")
+        params.append(cls)
+    if model_key is not None:
+        where.append("model_key = ?")
+        params.append(model_key)
+    if min_confidence is not None:
+        where.append("confidence >= ?")
+        params.append(min_confidence)
+    if bbox is not None:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        where.append("latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?")
+        params += [min_lat, max_lat, min_lng, max_lng]
+    if since is not None:
+        where.append("timestamp >= ?")
+        params.append(since)
+
+    # The indexes pick and order the matching rows; the other columns are
+    # then read from the table, at most `limit` rows (no covering index)
+    columns = ["id", *DETECTION_COLUMNS]
+    sql = f"SELECT {', '.join(columns)} FROM detections"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    rows = conn.execute(sql + " ORDER BY confidence DESC LIMIT ?", [*params, limit]).fetchall()
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def get_detection_counts(conn):
+    """[(model_key, class, count, avg_confidence)] over all stored detections"""
+    return conn.execute("SELECT model_key, class, COUNT(*), AVG(confidence) FROM detections "
+                        "GROUP BY model_key, class ORDER BY COUNT(*) DESC").fetchall()
+
+
+def detection_rows(predictions, model_key=None, track_ids=None):
+    """
+    Detection dicts for make_survey from model predictions; the model key is
+    the prediction's "model_type" (run_detection) or model_key
+    """
+    track_ids = track_ids or [None] * len(predictions)
+    return [{
+        "model_key": prediction.get("model_type", model_key),
+        "class": prediction.get("class"),
+        "confidence": prediction.get("confidence"),
+        "x": prediction.get("x"),
+        "y": prediction.get("y"),
+        "width": prediction.get("width"),
+        "height": prediction.get("height"),
+        "track_id": track_id,
+    } for prediction, track_id in zip(predictions, track_ids)]
+
+
+def make_survey(latitude, longitude, issue_counts, description='', report_type='',
+                source='manual_survey', timestamp=None, result_image=None, detections=None):
+    """
+    Build a survey row (dict keyed by SURVEY_COLUMNS) from per-model issue
+    counts; detections (see detection_rows) are stored with it
+    """
+    counts = {column: int(issue_counts.get(column, 0)) for column in ISSUE_COLUMNS}
+    return {
+        "timestamp": timestamp or datetime.now().isoformat(),
+        "latitude": latitude,
+        "longitude": longitude,
+        **counts,
+        "total_issues": sum(counts.values()),
+        "severity_score": sum(count * SEVERITY_WEIGHTS.get(column, 1.0) for column, count in counts.items()),
+        "description": description,
+        "report_type": report_type,
+        "source": source,
+        "result_image": result_image,
+        "detections": detections or [],
+    }
+
+
+insert_listeners = []
+
+
+def add_insert_listener(listener):
+    """Call listener(rows) with every batch of survey rows after it is committed"""
+    insert_listeners.append(listener)
+
+
+INSERT_SURVEY_SQL = (f"INSERT INTO surveys ({', '.join(SURVEY_COLUMNS)}) "
+                     f"VALUES ({', '.join('?' for _ in SURVEY_COLUMNS)})")
+INSERT_DETECTION_SQL = (f"INSERT INTO detections ({', '.join(DETECTION_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' for _ in DETECTION_COLUMNS)})")
+
+
+def _detection_values(survey_id, row, detections):
+    return [(survey_id, detection["model_key"], detection["class"], detection["confidence"],
+             detection["x"], detection["y"], detection["width"], detection["height"],
+             detection.get("track_id"), row["latitude"], row["longitude"], row["timestamp"])
+            for detection in detections]
+
+
+def insert_surveys(rows, conn=None):
+    """
+    Insert survey rows in a single transaction, returns their ids.
+
+    Listeners run after the pooled connection is returned: they may borrow
+    one themselves, and holding two at once can exhaust the pool.
+    """
+    if not rows:
+        return []
+
+    if conn is None:
+        with get_connection() as conn:
+            ids = _insert_rows(rows, conn)
+    else:
+        ids = _insert_rows(rows, conn)
+
+    for listener in insert_listeners:
+        try:
+            listener(rows)
+        except Exception as e:
+            print(f"Survey insert listener failed: {e}")
+    return ids
+
+
+def _insert_rows(rows, conn):
+    ids = []
+    detections = []
+    with conn:
+        cursor = conn.cursor()
+        for row in rows:
+            cursor.execute(INSERT_SURVEY_SQL, [row[column] for column in SURVEY_COLUMNS])
+            ids.append(cursor.lastrowid)
+            detections.extend(_detection_values(cursor.lastrowid, row, row.get("detections") or []))
+        # Every detection of the batch in one statement, same transaction
+        cursor.executemany(INSERT_DETECTION_SQL, detections)
+    return ids
+
+
+class SurveyWriter:
+    """
+    Write-behind batcher for survey inserts.
+
+    submit() only queues the row; a background thread commits everything
+    queued within SURVEY_FLUSH_INTERVAL (up to SURVEY_BATCH_SIZE rows) in one
+    transaction. flush() waits until everything submitted so far is stored,
+    held or rejected.
+
+    A batch that fails (e.g. SQLITE_BUSY) is retried SURVEY_WRITE_RETRIES
+    times with backoff, then written row by row: the good rows are committed
+    and only the failing ones are held. Held rows are tried again one by one
+    after the next batch commits; a row that still fails while the database
+    takes writes is bad in itself (e.g. a constraint error) and is rejected,
+    kept but not retried. get_stats() reports both.
+    """
+
+    def __init__(self, batch_size=SURVEY_BATCH_SIZE, flush_interval=SURVEY_FLUSH_INTERVAL, path=None,
+                 retries=SURVEY_WRITE_RETRIES):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.pending = queue.Queue()
+        self.submitted = 0
+        self.written = 0
+        self.held = []
+        self.rejected = []
+        self.retried = 0
+        self.last_error = None
+        self.condition = threading.Condition()
+        self.thread = None
+        self.start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self.thread is None or not self.thread.is_alive():
+            with self.start_lock:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self._run, name="survey-writer", daemon=True)
+                    self.thread.start()
+
+    def submit(self, row):
+        self._ensure_started()
+        with self.condition:
+            self.submitted += 1
+        self.pending.put(row)
+
+    def flush(self, timeout=10.0):
+        """Block until every row submitted so far has been committed or held"""
+        with self.condition:
+            target = self.submitted
+            return self.condition.wait_for(
+                lambda: self.written + len(self.held) + len(self.rejected) >= target, timeout)
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch, conn, retries):
+        """Insert batch, retrying with backoff; returns True once committed"""
+        for attempt in range(retries + 1):
+            try:
+                insert_surveys(batch, conn)
+                return True
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error writing {len(batch)} surveys (attempt {attempt + 1}): {e}")
+                if attempt < retries:
+                    self.retried += 1
+                    time.sleep(0.1 * 2 ** attempt)
+        return False
+
+    def _write_rows(self, rows, conn):
+        """Insert rows one by one, returns the rows that failed"""
+        return [row for row in rows if not self._write([row], conn, 0)]
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            batch = self._collect()
+            committed = self._write(batch, conn, self.retries)
+            failed = [] if committed else self._write_rows(batch, conn)
+            with self.condition:
+                self.written += len(batch) - len(failed)
+                self.held.extend(failed)
+                self.condition.notify_all()
+
+            # The database takes writes again: one more try for the held rows
+            if committed and self.held:
+                with self.condition:
+                    held, self.held = self.held, []
+                rejected = self._write_rows(held, conn)
+                with self.condition:
+                    self.written += len(held) - len(rejected)
+                    self.rejected.extend(rejected)
+                    self.condition.notify_all()
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                "submitted": self.submitted,
+                "written": self.written,
+                "queued": self.pending.qsize(),
+                "held": len(self.held),
+                "rejected": len(self.rejected),
+                "retries": self.retried,
+                "last_error": self.last_error,
+            }
+
+
+survey_writer = SurveyWriter()
+atexit.register(survey_writer.flush)
@@ -0,0 +1,78 @@
+"""
+Bulk robot survey runs.
+
+A run is a batch of frames plus the GPS track recorded while driving.
+Each frame's position is interpolated from the track at its capture time,
+so robots do not need a GPS fix per frame.
+"""
+
+import os
+import json
+import math
+
+import numpy as np
+
+ROBOT_MAX_RUN_FRAMES = int(os.getenv('ROBOT_MAX_RUN_FRAMES', 500))
+ROBOT_RUN_WORKERS = int(os.getenv('ROBOT_RUN_WORKERS', 2))
+ROBOT_RUN_QUEUE_SIZE = int(os.getenv('ROBOT_RUN_QUEUE_SIZE', 8))
+
+
+def parse_position(latitude, longitude):
+    """(latitude, longitude) as floats; ValueError unless finite and in range"""
+    latitude, longitude = float(latitude), float(longitude)
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        raise ValueError("latitude and longitude must be finite numbers")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude must be within [-90, 90] and longitude within [-180, 180]")
+    return latitude, longitude
+
+
+def parse_time(t):
+    """Unix time as float; ValueError unless finite"""
+    t = float(t)
+    if not math.isfinite(t):
+        raise ValueError("times must be finite numbers")
+    return t
+
+
+def parse_track(track):
+    """
+    GPS track -> (times, latitudes, longitudes) arrays sorted by time.
+
+    Accepts a JSON string or list of {"t", "latitude", "longitude"} objects
+    ("lat"/"lng" also work) or [t, latitude, longitude] triples; t is Unix
+    time in seconds, like the frame times.
+    """
+    if isinstance(track, (str, bytes)):
+        track = json.loads(track)
+    if not track:
+        raise ValueError("GPS track is empty")
+
+    points = []
+    for point in track:
+        if isinstance(point, dict):
+            t, lat, lng = (point["t"], point.get("latitude", point.get("lat")),
+                           point.get("longitude", point.get("lng")))
+        else:
+            t, lat, lng = point
+        points.append((parse_time(t), *parse_position(lat, lng)))
+
+    data = np.array(sorted(points), dtype=np.float64)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def frame_times_for(count, times, frame_times=None):
+    """Capture time per frame; spread evenly over the track if not given"""
+    if frame_times:
+        if isinstance(frame_times, (str, bytes)):
+            frame_times = json.loads(frame_times)
+        if len(frame_times) != count:
+            raise ValueError(f"Got {len(frame_times)} frame times for {count} frames")
+        return np.asarray([parse_time(t) for t in frame_times], dtype=np.float64)
+    return np.linspace(times[0], times[-1], count)
+
+
+def interpolate_positions(track, frame_times):
+    """(latitudes, longitudes) at frame_times; times outside the track clamp to its ends"""
+    times, latitudes, longitudes = track
+    return np.interp(frame_times, times, latitudes), np.interp(frame_times, times, longitudes)
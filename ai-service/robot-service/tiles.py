@@ -0,0 +1,214 @@
+"""
+Heatmap tile pyramid.
+
+Serves the survey heatmap as 256px web-mercator PNG tiles (z/x/y, the
+scheme Leaflet and OpenStreetMap use). Each tile is a kernel-density
+estimate: survey severities are accumulated into a pixel grid with NumPy
+and smoothed with a Gaussian kernel. Rendered tiles are cached on disk and
+served with ETags; inserting surveys deletes only the tiles whose area
+(plus the kernel margin) contains the new points.
+"""
+
+import os
+import math
+import threading
+
+import cv2
+import numpy as np
+
+HEATMAP_TILE_DIR = os.getenv('HEATMAP_TILE_DIR', 'static/tiles')
+HEATMAP_TILE_MAX_ZOOM = int(os.getenv('HEATMAP_TILE_MAX_ZOOM', 18))
+# Kernel standard deviation in pixels, and the density drawn fully red
+HEATMAP_TILE_SIGMA = float(os.getenv('HEATMAP_TILE_SIGMA', 8))
+HEATMAP_TILE_SATURATION = float(os.getenv('HEATMAP_TILE_SATURATION', 10))
+
+TILE_SIZE = 256
+MAX_LATITUDE = 85.05112878
+
+# Same stops as the admin dashboard legend: green, yellow, orange, red (BGR)
+GRADIENT = [
+    (0.0, (94, 197, 34)),
+    (0.3, (8, 179, 234)),
+    (0.6, (22, 115, 249)),
+    (1.0, (68, 68, 239)),
+]
+
+TILE_SQL = '''SELECT latitude, longitude, severity_score FROM surveys
+              WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?'''
+
+
+def _build_palette():
+    """256-entry BGR lookup table interpolated between the GRADIENT stops"""
+    positions = np.linspace(0.0, 1.0, 256)
+    stops = [stop for stop, _ in GRADIENT]
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    for channel in range(3):
+        palette[:, channel] = np.interp(positions, stops, [color[channel] for _, color in GRADIENT])
+    return palette
+
+
+PALETTE = _build_palette()
+
+
+def margin_pixels():
+    """Kernel reach beyond a tile edge, in pixels"""
+    return int(math.ceil(3 * HEATMAP_TILE_SIGMA))
+
+
+def project(latitudes, longitudes, zoom):
+    """Latitude/longitude -> global web-mercator pixel coordinates at zoom"""
+    scale = TILE_SIZE * (2 ** zoom)
+    lat = np.radians(np.clip(latitudes, -MAX_LATITUDE, MAX_LATITUDE))
+    px = (np.asarray(longitudes, dtype=np.float64) + 180.0) / 360.0 * scale
+    py = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * scale
+    return px, py
+
+
+def pixel_to_lnglat(px, py, zoom):
+    scale = TILE_SIZE * (2 ** zoom)
+    lng = px / scale * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * py / scale))))
+    return lng, lat
+
+
+def tile_bounds(z, x, y, margin=0):
+    """(min_lng, min_lat, max_lng, max_lat) of a tile grown by margin pixels"""
+    min_lng, max_lat = pixel_to_lnglat(x * TILE_SIZE - margin, y * TILE_SIZE - margin, z)
+    max_lng, min_lat = pixel_to_lnglat((x + 1) * TILE_SIZE + margin, (y + 1) * TILE_SIZE + margin, z)
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= HEATMAP_TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def render_tile(conn, z, x, y):
+    """PNG bytes of one heatmap tile (transparent where there are no surveys)"""
+    margin = margin_pixels()
+    size = TILE_SIZE + 2 * margin
+    density = np.zeros((size, size), dtype=np.float32)
+
+    min_lng, min_lat, max_lng, max_lat = tile_bounds(z, x, y, margin)
+    rows = conn.execute(TILE_SQL, (min_lat, max_lat, min_lng, max_lng)).fetchall()
+    if rows:
+        data = np.array([(lat, lng, severity or 0) for lat, lng, severity in rows], dtype=np.float64)
+        px, py = project(data[:, 0], data[:, 1], z)
+        cols = np.floor(px - x * TILE_SIZE + margin).astype(np.int64)
+        rows_ = np.floor(py - y * TILE_SIZE + margin).astype(np.int64)
+        inside = (cols >= 0) & (cols < size) & (rows_ >= 0) & (rows_ < size)
+        np.add.at(density, (rows_[inside], cols[inside]), data[inside, 2])
+
+        density = cv2.GaussianBlur(density, (0, 0), HEATMAP_TILE_SIGMA)
+        # Gaussian peak is 1 / (2 pi sigma^2); rescale so one survey of severity
+        # HEATMAP_TILE_SATURATION saturates, on every tile and zoom alike
+        density *= 2 * math.pi * HEATMAP_TILE_SIGMA ** 2
+
+    density = density[margin:margin + TILE_SIZE, margin:margin + TILE_SIZE]
+    level = np.clip(density / HEATMAP_TILE_SATURATION, 0.0, 1.0)
+
+    tile = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    tile[..., :3] = PALETTE[(level * 255).astype(np.uint8)]
+    # Fade in over the low end so empty areas stay transparent
+    tile[..., 3] = (np.clip(level * 4, 0.0, 1.0) * 200).astype(np.uint8)
+
+    ok, buffer = cv2.imencode('.png', tile)
+    if not ok:
+        raise ValueError("Could not encode tile")
+    return buffer.tobytes()
+
+
+class TileCache:
+    """
+    Rendered tiles on disk, one file per z/x/y.
+
+    invalidate_points() removes every cached tile a new survey can change.
+    A tile rendered while an invalidation happened is served but not stored,
+    so a render that read the old rows never overwrites the invalidation.
+    """
+
+    def __init__(self, root=HEATMAP_TILE_DIR, max_zoom=HEATMAP_TILE_MAX_ZOOM):
+        # Absolute: send_file resolves relative paths against the app root,
+        # not the working directory the tiles are written to
+        self.root = os.path.abspath(root)
+        self.max_zoom = max_zoom
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def path_for(self, z, x, y):
+        return os.path.join(self.root, str(z), str(x), f"{y}.png")
+
+    def get(self, conn, z, x, y):
+        """
+        (path, None) for a cached tile, rendering and storing it first if
+        needed, or (None, png_bytes) when surveys changed during the render
+        """
+        path = self.path_for(z, x, y)
+        if os.path.exists(path):
+            with self.lock:
+                self.hits += 1
+            return path, None
+
+        with self.lock:
+            self.misses += 1
+            generation = self.generation
+
+        data = render_tile(conn, z, x, y)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        with self.lock:
+            if generation == self.generation:
+                os.replace(tmp_path, path)
+                return path, None
+
+        os.remove(tmp_path)
+        return None, data
+
+    def tiles_for_points(self, latitudes, longitudes):
+        """Every z/x/y whose area plus kernel margin contains one of the points"""
+        if len(latitudes) == 0:
+            return set()
+
+        margin = margin_pixels()
+        touched = set()
+        for z in range(self.max_zoom + 1):
+            px, py = project(np.asarray(latitudes, dtype=np.float64), longitudes, z)
+            last = 2 ** z - 1
+            for dx in (-margin, 0, margin):
+                for dy in (-margin, 0, margin):
+                    xs = np.clip(np.floor((px + dx) / TILE_SIZE), 0, last).astype(np.int64)
+                    ys = np.clip(np.floor((py + dy) / TILE_SIZE), 0, last).astype(np.int64)
+                    touched.update((z, int(tx), int(ty)) for tx, ty in zip(xs, ys))
+        return touched
+
+    def invalidate_points(self, latitudes, longitudes):
+        with self.lock:
+            self.generation += 1
+            for z, x, y in self.tiles_for_points(latitudes, longitudes):
+                try:
+                    os.remove(self.path_for(z, x, y))
+                    self.invalidated += 1
+                except FileNotFoundError:
+                    pass
+
+    def invalidate_surveys(self, rows):
+        """storage insert listener"""
+        points = [(row["latitude"], row["longitude"]) for row in rows
+                  if row.get("latitude") is not None and row.get("longitude") is not None]
+        if points:
+            latitudes, longitudes = zip(*points)
+            self.invalidate_points(latitudes, longitudes)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidated": self.invalidated,
+                "directory": self.root,
+            }
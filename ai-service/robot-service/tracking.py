@@ -0,0 +1,163 @@
+"""
+Cross-frame issue tracker for robot frame sequences.
+
+A pothole stays in view for many consecutive frames. Each robot keeps a set
+of active tracks; the detections of a new frame are matched to them by IoU
+(same class only) after moving every track box by its last motion, so boxes
+that slide across the image as the robot drives still match. A detection is
+matched when the IoU is at least TRACK_IOU_THRESHOLD, best pairs first.
+
+- Matched detections continue their track (same track id)
+- Unmatched detections start a new track: a new physical issue
+- Tracks end when missed in TRACK_MAX_MISSES frames, not seen for
+  TRACK_MAX_AGE seconds, or the robot is TRACK_MAX_DISTANCE_M metres away
+  from where they were last seen
+
+Only new tracks are counted as issues.
+"""
+
+import os
+import time
+import uuid
+import threading
+
+from novelty import distance_m
+
+ROBOT_TRACKING = os.getenv('ROBOT_TRACKING', '1') == '1'
+TRACK_IOU_THRESHOLD = float(os.getenv('TRACK_IOU_THRESHOLD', 0.3))
+TRACK_MAX_MISSES = int(os.getenv('TRACK_MAX_MISSES', 3))
+TRACK_MAX_AGE = float(os.getenv('TRACK_MAX_AGE', 10))
+TRACK_MAX_DISTANCE_M = float(os.getenv('TRACK_MAX_DISTANCE_M', 30))
+
+
+def iou(a, b):
+    """IoU of two (x, y, width, height) center boxes"""
+    ax1, ay1, ax2, ay2 = a[0] - a[2] / 2, a[1] - a[3] / 2, a[0] + a[2] / 2, a[1] + a[3] / 2
+    bx1, by1, bx2, by2 = b[0] - b[2] / 2, b[1] - b[3] / 2, b[0] + b[2] / 2, b[1] + b[3] / 2
+    w = min(ax2, bx2) - max(ax1, bx1)
+    h = min(ay2, by2) - max(ay1, by1)
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / (a[2] * a[3] + b[2] * b[3] - inter)
+
+
+def _box(prediction):
+    return (float(prediction["x"]), float(prediction["y"]),
+            float(prediction["width"]), float(prediction["height"]))
+
+
+class IssueTracker:
+    """Active tracks per robot, plus frame/detection/track counts"""
+
+    def __init__(self, enabled=ROBOT_TRACKING):
+        self.enabled = enabled
+        self.robots = {}
+        self.lock = threading.Lock()
+
+    def _robot(self, robot_id):
+        return self.robots.setdefault(robot_id, {
+            "tracks": [],
+            # Mean motion of the matched tracks in the last frame, used for
+            # tracks that do not have a motion of their own yet
+            "motion": (0.0, 0.0),
+            "frames": 0,
+            "detections": 0,
+            "tracks_started": 0,
+        })
+
+    def _expire(self, robot, now, latitude, longitude):
+        robot["tracks"] = [
+            track for track in robot["tracks"]
+            if track["misses"] <= TRACK_MAX_MISSES
+            and now - track["last_seen"] <= TRACK_MAX_AGE
+            and distance_m(track["latitude"], track["longitude"], latitude, longitude) < TRACK_MAX_DISTANCE_M
+        ]
+
+    def update(self, robot_id, predictions, latitude, longitude, now=None):
+        """
+        Match one frame's predictions to robot_id's tracks.
+
+        Returns (new, continued, track_ids): lists of {"track_id", "class",
+        "confidence"} for detections that start a track and for detections
+        of an already tracked issue, and the track id of every prediction.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            robot = self._robot(robot_id)
+            robot["frames"] += 1
+            robot["detections"] += len(predictions)
+            self._expire(robot, now, latitude, longitude)
+
+            tracks = robot["tracks"]
+            boxes = [_box(prediction) for prediction in predictions]
+            pairs = []
+            for t, track in enumerate(tracks):
+                dx, dy = track["motion"] if track["hits"] > 1 else robot["motion"]
+                x, y, w, h = track["box"]
+                predicted = (x + dx, y + dy, w, h)
+                for d, prediction in enumerate(predictions):
+                    if prediction["class"] != track["class"]:
+                        continue
+                    overlap = iou(predicted, boxes[d])
+                    if overlap >= TRACK_IOU_THRESHOLD:
+                        pairs.append((overlap, t, d))
+
+            matched_tracks, matched_detections = set(), {}
+            for overlap, t, d in sorted(pairs, reverse=True):
+                if t not in matched_tracks and d not in matched_detections:
+                    matched_tracks.add(t)
+                    matched_detections[d] = tracks[t]
+
+            motions = []
+            for d, track in matched_detections.items():
+                box = boxes[d]
+                motion = (box[0] - track["box"][0], box[1] - track["box"][1])
+                motions.append(motion)
+                track.update(box=box, motion=motion, hits=track["hits"] + 1, misses=0, last_seen=now,
+                             latitude=latitude, longitude=longitude)
+            if motions:
+                robot["motion"] = (sum(m[0] for m in motions) / len(motions),
+                                   sum(m[1] for m in motions) / len(motions))
+            for t, track in enumerate(tracks):
+                if t not in matched_tracks:
+                    track["misses"] += 1
+
+            new, continued, track_ids = [], [], []
+            for d, prediction in enumerate(predictions):
+                track = matched_detections.get(d)
+                if track is None:
+                    track = {
+                        "track_id": uuid.uuid4().hex[:12],
+                        "class": prediction["class"],
+                        "box": boxes[d],
+                        "motion": (0.0, 0.0),
+                        "hits": 1,
+                        "misses": 0,
+                        "last_seen": now,
+                        "latitude": latitude,
+                        "longitude": longitude,
+                    }
+                    tracks.append(track)
+                    robot["tracks_started"] += 1
+                    issues = new
+                else:
+                    issues = continued
+                issues.append({"track_id": track["track_id"], "class": prediction["class"],
+                               "confidence": prediction.get("confidence")})
+                track_ids.append(track["track_id"])
+            return new, continued, track_ids
+
+    def get_stats(self):
+        with self.lock:
+            robots = {}
+            for robot_id, robot in self.robots.items():
+                detections = robot["detections"]
+                robots[robot_id] = {
+                    "frames": robot["frames"],
+                    "detections": detections,
+                    "unique_issues": robot["tracks_started"],
+                    "active_tracks": len(robot["tracks"]),
+                    "duplicate_rate": round(1 - robot["tracks_started"] / detections, 3) if detections else 0.0,
+                }
+            return {"enabled": self.enabled, "robots": robots}
@@ -0,0 +1,100 @@
+"""
+Streaming keyframe sampler for survey videos.
+
+Frames are read one at a time with VideoCapture.grab(); only frames at
+VIDEO_CHECK_INTERVAL steps are decoded (retrieve()) and compared with the
+last keyframe. A frame becomes a keyframe when:
+
+- it is the first frame, or VIDEO_MAX_INTERVAL seconds passed since the
+  last keyframe, or
+- at least VIDEO_MIN_INTERVAL seconds passed and the view changed: mean
+  thumbnail difference >= VIDEO_MOTION_THRESHOLD (motion) or histogram
+  correlation <= VIDEO_SCENE_THRESHOLD (scene change)
+
+Keyframes are yielded as they are found, so at most one decoded frame is
+held at a time.
+"""
+
+import os
+
+import cv2
+
+VIDEO_CHECK_INTERVAL = float(os.getenv('VIDEO_CHECK_INTERVAL', 0.25))
+VIDEO_MIN_INTERVAL = float(os.getenv('VIDEO_MIN_INTERVAL', 0.5))
+VIDEO_MAX_INTERVAL = float(os.getenv('VIDEO_MAX_INTERVAL', 5))
+VIDEO_MOTION_THRESHOLD = float(os.getenv('VIDEO_MOTION_THRESHOLD', 12))
+VIDEO_SCENE_THRESHOLD = float(os.getenv('VIDEO_SCENE_THRESHOLD', 0.6))
+VIDEO_MAX_KEYFRAMES = int(os.getenv('VIDEO_MAX_KEYFRAMES', 300))
+VIDEO_DEFAULT_FPS = 30.0
+
+
+def _signature(frame):
+    """Grayscale thumbnail and normalised histogram used for comparisons"""
+    gray = cv2.cvtColor(cv2.resize(frame, (64, 36), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+    hist = cv2.calcHist([gray], [0], None, [32], [0, 256])
+    cv2.normalize(hist, hist)
+    return gray, hist
+
+
+def sample_keyframes(path, max_keyframes=VIDEO_MAX_KEYFRAMES):
+    """
+    Yield (frame_index, seconds, frame, reason) for every keyframe of the
+    video at `path`, up to max_keyframes.
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError("Could not open video")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or VIDEO_DEFAULT_FPS
+    check_every = max(1, int(round(fps * VIDEO_CHECK_INTERVAL)))
+
+    last_time = None
+    last_signature = None
+    index = -1
+    keyframes = 0
+    try:
+        while keyframes < max_keyframes and capture.grab():
+            index += 1
+            if index % check_every:
+                continue
+
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            seconds = index / fps
+            signature = _signature(frame)
+
+            reason = None
+            if last_time is None:
+                reason = "first"
+            elif seconds - last_time >= VIDEO_MAX_INTERVAL:
+                reason = "interval"
+            elif seconds - last_time >= VIDEO_MIN_INTERVAL:
+                if cv2.compareHist(signature[1], last_signature[1], cv2.HISTCMP_CORREL) <= VIDEO_SCENE_THRESHOLD:
+                    reason = "scene"
+                elif cv2.absdiff(signature[0], last_signature[0]).mean() >= VIDEO_MOTION_THRESHOLD:
+                    reason = "motion"
+
+            if reason:
+                last_time = seconds
+                last_signature = signature
+                keyframes += 1
+                yield index, seconds, frame, reason
+    finally:
+        capture.release()
+
+
+def video_info(path):
+    capture = cv2.VideoCapture(path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or VIDEO_DEFAULT_FPS
+        frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        return {
+            "fps": round(fps, 3),
+            "frames": frames,
+            "duration": round(frames / fps, 2) if frames else None,
+            "width": int(capture.get(cv2.CAP_PROP_FRAME_WIDTH) or 0),
+            "height": int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0),
+        }
+    finally:
+        capture.release()
@@ -92,14 +92,14 @@ class CacheService:
             
             cached_data = self.redis_client.get(cache_key)
             if cached_data:
-                logger.info(f"Cache hit for key: {cache_key[:20]}...")
+                logger.debug("Cache hit for key: %.20s...", cache_key)
                 return json.loads(cached_data)
             
-            logger.debug(f"Cache miss for key: {cache_key[:20]}...")
+            logger.debug("Cache miss for key: %.20s...", cache_key)
             return None
         
         except Exception as e:
-            logger.error(f"Error getting cache: {e}")
+            logger.error("Error getting cache: %s", e)
             return None
     
     def set(self, result: Dict, image_path: str = None, image_base64: str = None) -> bool:
@@ -128,11 +128,11 @@ class CacheService:
                 config.CACHE_TTL,
                 json.dumps(result)
             )
-            logger.info(f"Cached result with key: {cache_key[:20]}...")
+            logger.debug("Cached result with key: %.20s...", cache_key)
             return True
         
         except Exception as e:
-            logger.error(f"Error setting cache: {e}")
+            logger.error("Error setting cache: %s", e)
             return False
     
     def clear(self) -> bool:
@@ -108,6 +108,75 @@ class ClassificationService:
             'message': 'Classification successful'
         }
     
+    def classify_report(self, image_detections: List[List[Dict]]) -> Dict:
+        """
+        Classify one report from the detections of all of its images
+        
+        Each image is treated as independent evidence: the best detection
+        of an issue type in each image is combined with a noisy-OR, so
+        1 - (1 - c1) * (1 - c2) * ... across images.
+        
+        Args:
+            image_detections: One list of YOLO detections per image
+            
+        Returns:
+            Classification result with fused confidence
+        """
+        combined = []
+        best_per_image = {}  # issue type -> {image index: best confidence}
+        best_class = {}  # issue type -> (confidence, ai class)
+        
+        for image_index, detections in enumerate(image_detections):
+            for det in detections:
+                combined.append(dict(det, image_index=image_index))
+                
+                issue_type = self.map_detection_to_issue_type(det['class_name'])
+                if issue_type is None:
+                    continue
+                
+                per_image = best_per_image.setdefault(issue_type, {})
+                per_image[image_index] = max(per_image.get(image_index, 0.0), det['confidence'])
+                if det['confidence'] > best_class.get(issue_type, (0.0, None))[0]:
+                    best_class[issue_type] = (det['confidence'], det['class_name'])
+        
+        fused = {}
+        for issue_type, per_image in best_per_image.items():
+            miss = 1.0
+            for confidence in per_image.values():
+                miss *= 1.0 - confidence
+            fused[issue_type] = 1.0 - miss
+        
+        # Put detections of the strongest fused issue type first
+        combined.sort(
+            key=lambda det: (
+                fused.get(self.map_detection_to_issue_type(det['class_name']), -1.0),
+                det['confidence']
+            ),
+            reverse=True
+        )
+        
+        result = self.classify_issue(combined)
+        result['images_analyzed'] = len(image_detections)
+        
+        issue_type = result['issue_type']
+        if issue_type in fused:
+            result['confidence'] = fused[issue_type]
+            result['supporting_images'] = sorted(best_per_image[issue_type])
+            result['alternative_classes'] = [
+                {
+                    'issue_type': other_type,
+                    'ai_class': best_class[other_type][1],
+                    'confidence': score,
+                    'supporting_images': sorted(best_per_image[other_type])
+                }
+                for other_type, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)
+                if other_type != issue_type
+            ][:5]
+        else:
+            result['supporting_images'] = []
+        
+        return result
+    
     def get_confidence_level(self, confidence: float) -> str:
         """Get confidence level description"""
         if confidence >= 0.9:
@@ -18,10 +18,17 @@ class Config:
     PORT = int(os.getenv('PORT', 5000))
     ENVIRONMENT = os.getenv('ENVIRONMENT', 'production')
     
+    # Logging
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # 'text' or 'json'
+    LOG_SAMPLE_RATE = int(os.getenv('LOG_SAMPLE_RATE', 20))  # per message, 0 = no sampling
+    LOG_SAMPLE_PERIOD = float(os.getenv('LOG_SAMPLE_PERIOD', 1.0))  # seconds
+    
     # Model
     MODEL_PATH = os.getenv('MODEL_PATH', './models/yolov8n.pt')
     CONFIDENCE_THRESHOLD = float(os.getenv('CONFIDENCE_THRESHOLD', 0.25))
     MODEL_DEVICE = os.getenv('MODEL_DEVICE', 'cpu')  # 'cpu' or 'cuda'
+    MAX_REPORT_IMAGES = int(os.getenv('MAX_REPORT_IMAGES', 10))
     
     # Redis Cache
     REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
@@ -29,6 +36,25 @@ class Config:
     REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
     CACHE_TTL = int(os.getenv('CACHE_TTL', 3600))
     
+    # Pre-fork workers (src.server)
+    WORKERS = int(os.getenv('WORKERS', 1))
+    WORKER_MAX_REQUESTS = int(os.getenv('WORKER_MAX_REQUESTS', 0))  # 0 = never recycle
+    WORKER_MAX_RSS_MB = int(os.getenv('WORKER_MAX_RSS_MB', 0))  # 0 = no ceiling
+    WORKER_CHECK_INTERVAL = float(os.getenv('WORKER_CHECK_INTERVAL', 5))
+    
+    # Redis Streams job queue (src.stream_worker)
+    STREAM_NAME = os.getenv('STREAM_NAME', 'civic:classify:jobs')
+    STREAM_GROUP = os.getenv('STREAM_GROUP', 'classifiers')
+    STREAM_DEAD_LETTER = os.getenv('STREAM_DEAD_LETTER', 'civic:classify:dead')
+    STREAM_RESULT_PREFIX = os.getenv('STREAM_RESULT_PREFIX', 'civic:classify:result:')
+    STREAM_RESULT_TTL = int(os.getenv('STREAM_RESULT_TTL', 3600))
+    STREAM_MAXLEN = int(os.getenv('STREAM_MAXLEN', 100000))
+    STREAM_WORKERS = int(os.getenv('STREAM_WORKERS', 1))
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 8))
+    STREAM_BLOCK_MS = int(os.getenv('STREAM_BLOCK_MS', 2000))
+    STREAM_MAX_RETRIES = int(os.getenv('STREAM_MAX_RETRIES', 3))
+    STREAM_CLAIM_IDLE_MS = int(os.getenv('STREAM_CLAIM_IDLE_MS', 60000))
+    
     # Issue Type Mapping (AI class -> Issue type)
     ISSUE_TYPE_MAPPING = {
         'pothole': 'pothole',
@@ -58,6 +84,12 @@ class ClassificationRequest(BaseModel):
     image_path: Optional[str] = None
     image_base64: Optional[str] = None
 
+class ClassificationJobRequest(BaseModel):
+    image_path: Optional[str] = None
+    image_base64: Optional[str] = None
+    result_key: Optional[str] = None
+    callback_url: Optional[str] = None
+
 class Detection(BaseModel):
     class_name: str
     confidence: float
@@ -0,0 +1,166 @@
+"""
+Logging Setup
+Non-blocking queue-based logging with sampling for hot paths
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from .config import config
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'color_message'
+}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Sample high-volume log lines
+
+    At most `rate` records per message template are let through every
+    `period` seconds. Dropped records are counted and the count is attached
+    to the next record of the same template as `suppressed`, so totals can
+    still be reconstructed from the log. Records at or above `min_level`
+    are never dropped.
+    """
+
+    def __init__(self, rate: int = 20, period: float = 1.0, min_level: int = logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self.min_level = min_level
+        self._windows: Dict[tuple, list] = {}  # key -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= self.min_level:
+            return True
+
+        # record.msg is the unformatted template when %-style args are used
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                if len(self._windows) > 10000:
+                    self._windows.clear()
+                window = self._windows[key] = [now, 0, 0]
+
+            if now - window[0] >= self.period:
+                window[0] = now
+                window[1] = 0
+
+            if window[1] >= self.rate:
+                window[2] += 1
+                return False
+
+            window[1] += 1
+            if window[2]:
+                record.suppressed = window[2]
+                window[2] = 0
+
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text formatter that appends `extra` fields as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+        if fields:
+            message += ' ' + ' '.join(f'{k}={v}' for k, v in fields.items())
+        return message
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _start_listener(handler: logging.Handler):
+    """Start a listener thread draining a fresh queue into the real handler"""
+    global _listener
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(level: str = None, log_format: str = None):
+    """
+    Route all logging through a background queue listener
+
+    Callers only pay for enqueueing a record; formatting and I/O happen on
+    the listener thread. Safe to call more than once, and the listener is
+    restarted in forked children (src.server, src.stream_worker), where the
+    parent's thread does not exist.
+
+    Args:
+        level: Root log level (default LOG_LEVEL)
+        log_format: 'text' or 'json' (default LOG_FORMAT)
+    """
+    global _queue_handler
+
+    if _queue_handler is not None:
+        return
+
+    level = level or config.LOG_LEVEL
+    log_format = log_format or config.LOG_FORMAT
+
+    handler = logging.StreamHandler()
+    if log_format == 'json':
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(StructuredFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    _queue_handler = QueueHandler(queue.SimpleQueue())
+    _queue_handler.addFilter(RateLimitFilter(config.LOG_SAMPLE_RATE, config.LOG_SAMPLE_PERIOD))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    # Send uvicorn's error and access logs through the same queue
+    for name in ('uvicorn', 'uvicorn.error', 'uvicorn.access'):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _start_listener(handler)
+    atexit.register(stop_logging)
+    os.register_at_fork(after_in_child=lambda: _start_listener(handler))
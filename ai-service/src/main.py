@@ -4,23 +4,28 @@ Civic Issue Image Classification API
 """
 
 import os
+import io
+import time
 import logging
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 from datetime import datetime
+from typing import List, Optional
+from PIL import Image
 
-from .config import config, ClassificationRequest, ClassificationResponse
+from .config import config, ClassificationRequest, ClassificationResponse, ClassificationJobRequest
 from .model import get_model_handler
 from .classifier import get_classification_service
 from .cache import get_cache_service
+from .server import get_worker_stats
+from .stream_worker import ClassificationJobQueue
+from .responses import classification_response, parse_fields
+from .logging_config import setup_logging
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
@@ -45,6 +50,36 @@ app.add_middleware(
 model_handler = None
 classifier = None
 cache = None
+job_queue = None
+
+
+def get_job_queue() -> ClassificationJobQueue:
+    """Connect to the job stream on first use"""
+    global job_queue
+    if job_queue is None:
+        job_queue = ClassificationJobQueue()
+    return job_queue
+
+
+def check_fields(fields: Optional[str]):
+    """Reject unknown `fields` before any inference runs"""
+    try:
+        parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def log_classification(endpoint: str, result: dict, started: float, **fields):
+    """Emit one structured record per classification request"""
+    logger.info(
+        "%s issue_type=%s confidence=%.2f",
+        endpoint, result.get('issue_type'), result.get('confidence') or 0.0,
+        extra={
+            'detections': len(result.get('all_detections') or []),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            **fields
+        }
+    )
 
 
 @app.on_event("startup")
@@ -158,17 +193,27 @@ async def get_model_info():
 
 
 @app.post("/classify", response_model=ClassificationResponse)
-async def classify_image(file: UploadFile = File(...)):
+async def classify_image(
+    file: UploadFile = File(...),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    detail: str = Query('full', pattern='^(full|summary)$', description="'summary' omits all_detections"),
+    max_detections: Optional[int] = Query(None, ge=0, description="Truncate all_detections to the top N")
+):
     """
     Classify civic issue from image
     
     Args:
         file: Image file (jpg, png, jpeg)
+        fields: Comma separated list of response fields
+        detail: 'full' or 'summary'
+        max_detections: Maximum number of entries in all_detections
         
     Returns:
         Classification result with issue type and confidence
     """
+    check_fields(fields)
     temp_path = None
+    started = time.perf_counter()
     
     try:
         # Validate file type
@@ -186,27 +231,23 @@ async def classify_image(file: UploadFile = File(...)):
             content = await file.read()
             f.write(content)
         
-        logger.info(f"Processing image: {file.filename} ({len(content)} bytes)")
-        
         # Check cache first
         cached_result = cache.get(image_path=temp_path)
         if cached_result:
-            logger.info("Returning cached classification result")
-            return ClassificationResponse(**cached_result)
+            log_classification('classify', cached_result, started, cache_hit=True, bytes=len(content))
+            return classification_response(cached_result, fields, detail, max_detections)
         
         # Run inference
-        logger.info("Running YOLOv8 inference...")
         detections = model_handler.predict(temp_path)
-        logger.info(f"Found {len(detections)} detections")
         
         # Classify issue
         result = classifier.classify_issue(detections)
-        logger.info(f"Classification: {result['issue_type']} (confidence: {result['confidence']:.2f})")
         
         # Cache result
         cache.set(result, image_path=temp_path)
         
-        return ClassificationResponse(**result)
+        log_classification('classify', result, started, cache_hit=False, bytes=len(content))
+        return classification_response(result, fields, detail, max_detections)
     
     except HTTPException:
         raise
@@ -225,16 +266,27 @@ async def classify_image(file: UploadFile = File(...)):
 
 
 @app.post("/classify-base64", response_model=ClassificationResponse)
-async def classify_base64(request: ClassificationRequest):
+async def classify_base64(
+    request: ClassificationRequest,
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    detail: str = Query('full', pattern='^(full|summary)$', description="'summary' omits all_detections"),
+    max_detections: Optional[int] = Query(None, ge=0, description="Truncate all_detections to the top N")
+):
     """
     Classify civic issue from base64 encoded image
     
     Args:
         request: Classification request with base64 image
+        fields: Comma separated list of response fields
+        detail: 'full' or 'summary'
+        max_detections: Maximum number of entries in all_detections
         
     Returns:
         Classification result with issue type and confidence
     """
+    check_fields(fields)
+    started = time.perf_counter()
+    
     try:
         if not request.image_base64:
             raise HTTPException(
@@ -242,27 +294,23 @@ async def classify_base64(request: ClassificationRequest):
                 detail="image_base64 is required"
             )
         
-        logger.info("Processing base64 image")
-        
         # Check cache
         cached_result = cache.get(image_base64=request.image_base64)
         if cached_result:
-            logger.info("Returning cached classification result")
-            return ClassificationResponse(**cached_result)
+            log_classification('classify-base64', cached_result, started, cache_hit=True)
+            return classification_response(cached_result, fields, detail, max_detections)
         
         # Run inference
-        logger.info("Running YOLOv8 inference...")
         detections = model_handler.predict_from_base64(request.image_base64)
-        logger.info(f"Found {len(detections)} detections")
         
         # Classify issue
         result = classifier.classify_issue(detections)
-        logger.info(f"Classification: {result['issue_type']} (confidence: {result['confidence']:.2f})")
         
         # Cache result
         cache.set(result, image_base64=request.image_base64)
         
-        return ClassificationResponse(**result)
+        log_classification('classify-base64', result, started, cache_hit=False)
+        return classification_response(result, fields, detail, max_detections)
     
     except HTTPException:
         raise
@@ -272,6 +320,138 @@ async def classify_base64(request: ClassificationRequest):
         raise HTTPException(status_code=500, detail=f"Classification failed: {str(e)}")
 
 
+@app.post("/classify-report", response_model=ClassificationResponse)
+async def classify_report(
+    files: List[UploadFile] = File(...),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    detail: str = Query('full', pattern='^(full|summary)$', description="'summary' omits all_detections"),
+    max_detections: Optional[int] = Query(None, ge=0, description="Truncate all_detections to the top N")
+):
+    """
+    Classify one civic issue report from all of its images
+    
+    All images run through YOLOv8 as a single batch and their detections
+    are fused into one classification.
+    
+    Args:
+        files: Image files of the same report (jpg, png, jpeg)
+        fields: Comma separated list of response fields
+        detail: 'full' or 'summary'
+        max_detections: Maximum number of entries in all_detections
+        
+    Returns:
+        Classification result with fused confidence and supporting images
+    """
+    check_fields(fields)
+    started = time.perf_counter()
+    
+    if len(files) > config.MAX_REPORT_IMAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.MAX_REPORT_IMAGES} images per report are allowed."
+        )
+    
+    try:
+        images = []
+        for file in files:
+            if not file.content_type or not file.content_type.startswith('image/'):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid file type for {file.filename}. Only images are allowed."
+                )
+            
+            content = await file.read()
+            try:
+                images.append(Image.open(io.BytesIO(content)).convert('RGB'))
+            except Exception:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Could not decode image {file.filename}"
+                )
+        
+        # One forward pass for the whole report
+        image_detections = model_handler.predict_batch(images)
+        
+        result = classifier.classify_report(image_detections)
+        
+        log_classification('classify-report', result, started, cache_hit=False, images=len(images))
+        return classification_response(result, fields, detail, max_detections)
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        logger.error(f"Error classifying report: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Classification failed: {str(e)}")
+
+
+@app.post("/jobs", status_code=202)
+async def enqueue_classification_job(request: ClassificationJobRequest):
+    """
+    Queue an image for classification by the stream workers
+    
+    Args:
+        request: Image reference plus optional result key / callback URL
+        
+    Returns:
+        Job id and the Redis key the result will be written to
+    """
+    if not request.image_path and not request.image_base64:
+        raise HTTPException(
+            status_code=400,
+            detail="image_path or image_base64 is required"
+        )
+    
+    try:
+        job = get_job_queue().enqueue(
+            image_path=request.image_path,
+            image_base64=request.image_base64,
+            result_key=request.result_key,
+            callback_url=request.callback_url
+        )
+        return {
+            "success": True,
+            "status": "queued",
+            **job,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    except Exception as e:
+        logger.error(f"Error queueing classification job: {e}")
+        raise HTTPException(status_code=503, detail=f"Job queue unavailable: {str(e)}")
+
+
+@app.get("/jobs/stats")
+async def get_job_queue_stats():
+    """Get job stream statistics"""
+    try:
+        return {
+            "success": True,
+            "data": get_job_queue().get_stats(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting job queue stats: {e}")
+        raise HTTPException(status_code=503, detail=f"Job queue unavailable: {str(e)}")
+
+
+@app.get("/jobs/{job_id}")
+async def get_classification_job(job_id: str):
+    """Get the status and result of a queued classification job"""
+    try:
+        result = get_job_queue().get_result(job_id=job_id)
+    
+    except Exception as e:
+        logger.error(f"Error getting job {job_id}: {e}")
+        raise HTTPException(status_code=503, detail=f"Job queue unavailable: {str(e)}")
+    
+    if result is None:
+        return {"success": True, "job_id": job_id, "status": "pending"}
+    
+    return {"success": True, "job_id": job_id, "status": result['status'], "result": result}
+
+
 @app.get("/cache/stats")
 async def get_cache_stats():
     """Get cache statistics"""
@@ -288,6 +468,22 @@ async def get_cache_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/stats")
+async def get_stats():
+    """Get per-worker memory statistics (RSS, shared vs private)"""
+    try:
+        stats = get_worker_stats()
+        return {
+            "success": True,
+            "data": stats,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting worker stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/cache/clear")
 async def clear_cache():
     """Clear all cached classifications"""
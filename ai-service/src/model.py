@@ -19,8 +19,9 @@ logger = logging.getLogger(__name__)
 class YOLOv8Handler:
     """Handler for YOLOv8 model operations"""
     
-    def __init__(self):
+    def __init__(self, model_path: Optional[str] = None):
         self.model = None
+        self.model_path = model_path or config.MODEL_PATH
         self.device = config.MODEL_DEVICE
         self.confidence_threshold = config.CONFIDENCE_THRESHOLD
         self._initialize_model()
@@ -28,7 +29,7 @@ class YOLOv8Handler:
     def _initialize_model(self):
         """Initialize YOLOv8 model"""
         try:
-            model_path = config.MODEL_PATH
+            model_path = self.model_path
             
             # Check if it's a keras model (wrong format for YOLOv8)
             if model_path.endswith('.keras'):
@@ -59,6 +60,40 @@ class YOLOv8Handler:
             logger.error(f"Failed to initialize model: {str(e)}")
             raise
     
+    def _parse_result(self, result) -> List[Dict]:
+        """
+        Convert one YOLOv8 result into detection dicts
+        
+        Args:
+            result: Ultralytics result for a single image
+            
+        Returns:
+            List of detections sorted by confidence (highest first)
+        """
+        detections = []
+        
+        for box in result.boxes:
+            # Get class name
+            class_id = int(box.cls[0])
+            class_name = result.names[class_id]
+            
+            # Get confidence
+            confidence = float(box.conf[0])
+            
+            # Get bounding box coordinates
+            bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
+            
+            detections.append({
+                'class_name': class_name,
+                'confidence': confidence,
+                'bbox': bbox
+            })
+        
+        # Sort by confidence (highest first)
+        detections.sort(key=lambda x: x['confidence'], reverse=True)
+        
+        return detections
+    
     def predict(self, image_path: str) -> List[Dict]:
         """
         Run inference on image
@@ -77,33 +112,7 @@ class YOLOv8Handler:
                 verbose=False
             )
             
-            detections = []
-            
-            # Process results
-            for result in results:
-                boxes = result.boxes
-                
-                for box in boxes:
-                    # Get class name
-                    class_id = int(box.cls[0])
-                    class_name = result.names[class_id]
-                    
-                    # Get confidence
-                    confidence = float(box.conf[0])
-                    
-                    # Get bounding box coordinates
-                    bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-                    
-                    detections.append({
-                        'class_name': class_name,
-                        'confidence': confidence,
-                        'bbox': bbox
-                    })
-            
-            # Sort by confidence (highest first)
-            detections.sort(key=lambda x: x['confidence'], reverse=True)
-            
-            return detections
+            return self._parse_result(results[0])
             
         except Exception as e:
             logger.error(f"Prediction failed: {str(e)}")
@@ -137,35 +146,42 @@ class YOLOv8Handler:
                 verbose=False
             )
             
-            detections = []
+            return self._parse_result(results[0])
             
-            for result in results:
-                boxes = result.boxes
-                
-                for box in boxes:
-                    class_id = int(box.cls[0])
-                    class_name = result.names[class_id]
-                    confidence = float(box.conf[0])
-                    bbox = box.xyxy[0].tolist()
-                    
-                    detections.append({
-                        'class_name': class_name,
-                        'confidence': confidence,
-                        'bbox': bbox
-                    })
+        except Exception as e:
+            logger.error(f"Base64 prediction failed: {str(e)}")
+            raise
+    
+    def predict_batch(self, images: List) -> List[List[Dict]]:
+        """
+        Run inference on several images in one forward pass
+        
+        Args:
+            images: Image paths, PIL images or numpy arrays
             
-            detections.sort(key=lambda x: x['confidence'], reverse=True)
+        Returns:
+            One list of detections per input image, in input order
+        """
+        if not images:
+            return []
+        
+        try:
+            results = self.model(
+                images,
+                conf=self.confidence_threshold,
+                verbose=False
+            )
             
-            return detections
+            return [self._parse_result(result) for result in results]
             
         except Exception as e:
-            logger.error(f"Base64 prediction failed: {str(e)}")
+            logger.error(f"Batch prediction failed: {str(e)}")
             raise
     
     def get_model_info(self) -> Dict:
         """Get model information"""
         return {
-            'model_path': config.MODEL_PATH,
+            'model_path': self.model_path,
             'device': self.device,
             'confidence_threshold': self.confidence_threshold,
             'model_loaded': self.model is not None,
@@ -0,0 +1,87 @@
+"""
+Fast Response Serialization
+Serializes classification results without re-validating them
+"""
+
+from typing import Dict, Optional, Set
+
+from fastapi.responses import JSONResponse
+
+from .config import ClassificationResponse
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+    FastJSONResponse = JSONResponse
+
+# classify_report adds images_analyzed and supporting_images
+CLASSIFICATION_FIELDS = tuple(ClassificationResponse.model_fields) + ('images_analyzed', 'supporting_images')
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """
+    Parse the `fields` query parameter
+
+    Returns:
+        Set of requested fields, or None for all of them
+
+    Raises:
+        ValueError: If a field is not in CLASSIFICATION_FIELDS
+    """
+    if not fields:
+        return None
+
+    wanted = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = sorted(wanted - set(CLASSIFICATION_FIELDS))
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}. Valid fields: {', '.join(CLASSIFICATION_FIELDS)}"
+        )
+    return wanted
+
+
+def shape_classification(result: Dict, fields: Optional[str] = None,
+                         detail: str = 'full', max_detections: Optional[int] = None) -> Dict:
+    """
+    Select the parts of a classification result the caller asked for
+
+    Args:
+        result: Result from ClassificationService.classify_issue
+        fields: Comma separated list of fields to return (default: all),
+            validated by parse_fields
+        detail: 'full' keeps all_detections, 'summary' omits it
+        max_detections: Keep only the top N entries of all_detections
+
+    Returns:
+        Response payload (a new dict, the cached result is not modified)
+    """
+    wanted = parse_fields(fields)
+    if wanted:
+        # 'success' is always returned so callers can branch on it
+        wanted.add('success')
+        payload = {key: value for key, value in result.items() if key in wanted}
+    else:
+        payload = dict(result)
+
+    if detail == 'summary':
+        payload.pop('all_detections', None)
+    elif max_detections is not None and 'all_detections' in payload:
+        payload['all_detections'] = payload['all_detections'][:max_detections]
+
+    return payload
+
+
+def classification_response(result: Dict, fields: Optional[str] = None,
+                            detail: str = 'full', max_detections: Optional[int] = None,
+                            status_code: int = 200) -> JSONResponse:
+    """
+    Build the HTTP response for a classification result
+
+    classify_issue already produces the ClassificationResponse shape, so
+    returning a Response directly skips FastAPI's response_model validation
+    and encodes with orjson when it is installed.
+    """
+    payload = shape_classification(result, fields, detail, max_detections)
+    return FastJSONResponse(content=payload, status_code=status_code)
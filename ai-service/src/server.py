@@ -0,0 +1,332 @@
+"""
+Pre-forked Multi-Worker Server
+Loads the YOLOv8 model once in a master process, then forks uvicorn
+workers that share the model weights copy-on-write
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from .config import config
+from .logging_config import setup_logging, stop_logging
+
+logger = logging.getLogger(__name__)
+
+# Set by the master so workers can find their siblings for /stats
+MASTER_PID_ENV = 'AI_SERVICE_MASTER_PID'
+
+
+def read_memory_info(pid: int) -> Optional[Dict]:
+    """
+    Read memory usage of a process from /proc (Linux only)
+
+    Args:
+        pid: Process id
+
+    Returns:
+        RSS, PSS, shared and private memory in MB, or None if unavailable
+    """
+    fields = {}
+    try:
+        # smaps_rollup splits resident pages into shared and private
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        try:
+            # Older kernels: statm only reports resident and file-backed pages
+            with open(f'/proc/{pid}/statm') as f:
+                _, resident, shared = (int(v) for v in f.read().split()[:3])
+            page_kb = os.sysconf('SC_PAGE_SIZE') // 1024
+            fields = {
+                'Rss': resident * page_kb,
+                'Shared_Clean': shared * page_kb,
+                'Private_Dirty': (resident - shared) * page_kb,
+            }
+        except (OSError, ValueError):
+            return None
+
+    shared_kb = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    private_kb = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+
+    return {
+        'pid': pid,
+        'rss_mb': round(fields.get('Rss', 0) / 1024, 2),
+        'pss_mb': round(fields.get('Pss', fields.get('Rss', 0)) / 1024, 2),
+        'shared_mb': round(shared_kb / 1024, 2),
+        'private_mb': round(private_kb / 1024, 2),
+    }
+
+
+def _child_pids(parent_pid: int) -> List[int]:
+    """List direct children of a process"""
+    try:
+        with open(f'/proc/{parent_pid}/task/{parent_pid}/children') as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        pass
+
+    # Fallback: scan /proc for processes whose parent is parent_pid
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+            # Field 4 (ppid) follows the parenthesised command name
+            ppid = int(stat.rsplit(')', 1)[1].split()[1])
+            if ppid == parent_pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def get_worker_stats() -> Dict:
+    """
+    Get memory statistics for the serving processes
+
+    Returns:
+        Per-worker RSS with shared/private split, plus totals. PSS divides
+        shared pages between the processes mapping them, so total_pss_mb is
+        the real footprint of the whole worker pool.
+    """
+    master_pid = os.getenv(MASTER_PID_ENV)
+
+    if master_pid:
+        mode = 'prefork'
+        pids = sorted(_child_pids(int(master_pid)))
+    else:
+        mode = 'single'
+        pids = [os.getpid()]
+
+    workers = []
+    for pid in pids:
+        info = read_memory_info(pid)
+        if info:
+            info['current'] = pid == os.getpid()
+            workers.append(info)
+
+    master = read_memory_info(int(master_pid)) if master_pid else None
+
+    return {
+        'mode': mode,
+        'master': master,
+        'workers': workers,
+        'worker_count': len(workers),
+        'total_rss_mb': round(sum(w['rss_mb'] for w in workers), 2),
+        'total_pss_mb': round(sum(w['pss_mb'] for w in workers), 2),
+        'total_private_mb': round(sum(w['private_mb'] for w in workers), 2),
+        'max_requests': config.WORKER_MAX_REQUESTS,
+        'max_rss_mb': config.WORKER_MAX_RSS_MB,
+    }
+
+
+class PreforkServer:
+    """Master process that preloads the model and supervises forked workers"""
+
+    def __init__(self, host: str, port: int, workers: int,
+                 max_requests: int = 0, max_rss_mb: int = 0,
+                 check_interval: float = 5.0):
+        self.host = host
+        self.port = port
+        self.num_workers = max(1, workers)
+        self.max_requests = max_requests
+        self.max_rss_mb = max_rss_mb
+        self.check_interval = check_interval
+
+        self.app = None
+        self.sock = None
+        self.workers: Dict[int, float] = {}  # pid -> start time
+        self.retiring = set()
+        self.alive = True
+
+    def preload(self):
+        """Load the model and app in the master before forking"""
+        from .model import get_model_handler
+        from .classifier import get_classification_service
+        from .main import app
+
+        logger.info("Preloading YOLOv8 model in master process...")
+        get_model_handler()
+        get_classification_service()
+        self.app = app
+
+        # Move everything allocated so far out of the GC's reach, so the
+        # collector in each worker does not write to (and copy) shared pages
+        gc.collect()
+        gc.freeze()
+        logger.info("✓ Model preloaded, pages will be shared with workers")
+
+    def _bind(self):
+        """Bind the listening socket once; every worker accepts on it"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+    def _spawn_worker(self):
+        """Fork a new worker process"""
+        pid = os.fork()
+
+        if pid == 0:
+            # Worker: restore default signal handling, uvicorn installs its own
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(sig, signal.SIG_DFL)
+
+            exit_code = 0
+            try:
+                self._run_worker()
+            except Exception as e:
+                logger.error(f"Worker {os.getpid()} crashed: {e}", exc_info=True)
+                exit_code = 1
+            finally:
+                stop_logging()
+                os._exit(exit_code)
+
+        self.workers[pid] = time.time()
+        logger.info(f"Started worker {pid}")
+
+    def _run_worker(self):
+        """Serve requests until recycled or shut down"""
+        server_config = uvicorn.Config(
+            self.app,
+            limit_max_requests=self.max_requests or None,
+            log_level="info",
+            log_config=None,  # keep the queue-based logging from setup_logging
+        )
+        server = uvicorn.Server(server_config)
+        server.run(sockets=[self.sock])
+
+    def _reap_workers(self):
+        """Collect exited workers and replace them"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+
+            if pid == 0:
+                return
+
+            started = self.workers.pop(pid, time.time())
+            self.retiring.discard(pid)
+            logger.info(f"Worker {pid} exited (status {os.waitstatus_to_exitcode(status)})")
+
+            if self.alive:
+                # Avoid a fork loop when workers die during boot
+                if time.time() - started < 1:
+                    time.sleep(1)
+                self._spawn_worker()
+
+    def _check_memory(self):
+        """Recycle workers whose private memory exceeds the ceiling"""
+        if not self.max_rss_mb:
+            return
+
+        for pid in list(self.workers):
+            if pid in self.retiring:
+                continue
+
+            info = read_memory_info(pid)
+            # Shared model pages are not a leak, only count private memory
+            if info and info['private_mb'] > self.max_rss_mb:
+                logger.warning(
+                    f"Worker {pid} private RSS {info['private_mb']}MB exceeds "
+                    f"{self.max_rss_mb}MB, recycling"
+                )
+                self.retiring.add(pid)
+                os.kill(pid, signal.SIGTERM)
+
+    def _handle_exit(self, signum, frame):
+        self.alive = False
+
+    def _shutdown(self, timeout: float = 30.0):
+        """Stop all workers gracefully, then forcefully"""
+        logger.info("Shutting down workers...")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.time() + timeout
+        while self.workers and time.time() < deadline:
+            self._reap_workers()
+            time.sleep(0.1)
+
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        """Preload, fork workers and supervise them until stopped"""
+        os.environ[MASTER_PID_ENV] = str(os.getpid())
+
+        self.preload()
+        self._bind()
+
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+
+        logger.info(
+            f"Master {os.getpid()} listening on {self.host}:{self.port} "
+            f"with {self.num_workers} workers"
+        )
+        for _ in range(self.num_workers):
+            self._spawn_worker()
+
+        last_check = time.time()
+        while self.alive:
+            self._reap_workers()
+
+            if time.time() - last_check >= self.check_interval:
+                self._check_memory()
+                last_check = time.time()
+
+            time.sleep(0.5)
+
+        self._shutdown()
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-forked AI classification server")
+    parser.add_argument('--host', default=config.HOST)
+    parser.add_argument('--port', type=int, default=config.PORT)
+    parser.add_argument('--workers', type=int, default=config.WORKERS)
+    parser.add_argument('--max-requests', type=int, default=config.WORKER_MAX_REQUESTS,
+                        help="Recycle a worker after this many requests (0 = never)")
+    parser.add_argument('--max-rss-mb', type=int, default=config.WORKER_MAX_RSS_MB,
+                        help="Recycle a worker above this private RSS (0 = no ceiling)")
+    args = parser.parse_args()
+
+    setup_logging()
+
+    PreforkServer(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_requests=args.max_requests,
+        max_rss_mb=args.max_rss_mb,
+        check_interval=config.WORKER_CHECK_INTERVAL,
+    ).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
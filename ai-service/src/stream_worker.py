@@ -0,0 +1,429 @@
+"""
+Redis Streams Classification Workers
+Queue-driven alternative to synchronous /classify calls
+"""
+
+import os
+import io
+import gc
+import sys
+import json
+import time
+import uuid
+import base64
+import signal
+import socket
+import logging
+import argparse
+import urllib.request
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from PIL import Image
+
+from .config import config
+from .logging_config import setup_logging, stop_logging
+
+logger = logging.getLogger(__name__)
+
+
+def create_redis_client() -> redis.Redis:
+    """Create a Redis client from the service configuration"""
+    return redis.Redis(
+        host=config.REDIS_HOST,
+        port=config.REDIS_PORT,
+        password=config.REDIS_PASSWORD if config.REDIS_PASSWORD else None,
+        db=0,
+        decode_responses=True,
+        socket_timeout=max(5, config.STREAM_BLOCK_MS / 1000 + 5),
+        socket_connect_timeout=5
+    )
+
+
+class ClassificationJobQueue:
+    """Producer side of the classification job stream"""
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.redis_client = redis_client or create_redis_client()
+        self.stream = config.STREAM_NAME
+        self.group = config.STREAM_GROUP
+        self.dead_letter = config.STREAM_DEAD_LETTER
+        self.ensure_group()
+
+    def ensure_group(self):
+        """Create the stream and consumer group if they do not exist yet"""
+        try:
+            self.redis_client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def result_key(self, job_id: str) -> str:
+        """Default Redis key holding the result of a job"""
+        return f"{config.STREAM_RESULT_PREFIX}{job_id}"
+
+    def enqueue(self, image_path: str = None, image_base64: str = None,
+                result_key: str = None, callback_url: str = None) -> Dict:
+        """
+        Push a classification job onto the stream
+
+        Args:
+            image_path: Path to an image readable by the workers
+            image_base64: Base64 encoded image
+            result_key: Redis key to write the result to
+            callback_url: URL the result is POSTed to when done
+
+        Returns:
+            Job id, result key and stream entry id
+        """
+        if not image_path and not image_base64:
+            raise ValueError("image_path or image_base64 is required")
+
+        job_id = uuid.uuid4().hex
+        result_key = result_key or self.result_key(job_id)
+
+        fields = {
+            'job_id': job_id,
+            'result_key': result_key,
+            'enqueued_at': datetime.utcnow().isoformat(),
+        }
+        if image_path:
+            fields['image_path'] = image_path
+        if image_base64:
+            fields['image_base64'] = image_base64
+        if callback_url:
+            fields['callback_url'] = callback_url
+
+        entry_id = self.redis_client.xadd(
+            self.stream, fields, maxlen=config.STREAM_MAXLEN, approximate=True
+        )
+
+        return {
+            'job_id': job_id,
+            'result_key': result_key,
+            'stream_id': entry_id,
+        }
+
+    def get_result(self, job_id: str = None, result_key: str = None) -> Optional[Dict]:
+        """
+        Get the result of a job
+
+        Returns:
+            Stored result, or None while the job is still pending
+        """
+        key = result_key or self.result_key(job_id)
+        data = self.redis_client.get(key)
+        return json.loads(data) if data else None
+
+    def get_stats(self) -> Dict:
+        """Get queue length, pending and dead-lettered job counts"""
+        pending = self.redis_client.xpending(self.stream, self.group)
+        consumers = self.redis_client.xinfo_consumers(self.stream, self.group)
+
+        return {
+            'stream': self.stream,
+            'length': self.redis_client.xlen(self.stream),
+            'pending': pending.get('pending', 0),
+            'consumers': len(consumers),
+            'dead_letters': self.redis_client.xlen(self.dead_letter),
+        }
+
+
+class StreamWorker:
+    """Consumer-group worker that batch-classifies jobs from the stream"""
+
+    def __init__(self, consumer_name: str = None, redis_client: Optional[redis.Redis] = None,
+                 model_handler=None, classifier=None, cache=None):
+        # Imported only when not injected, so queue checks run without YOLOv8
+        if model_handler is None:
+            from .model import get_model_handler
+            model_handler = get_model_handler()
+        if classifier is None:
+            from .classifier import get_classification_service
+            classifier = get_classification_service()
+        if cache is None:
+            from .cache import get_cache_service
+            cache = get_cache_service()
+
+        self.queue = ClassificationJobQueue(redis_client)
+        self.redis_client = self.queue.redis_client
+        self.consumer = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.model_handler = model_handler
+        self.classifier = classifier
+        self.cache = cache
+        self.batch_size = config.STREAM_BATCH_SIZE
+        self.running = False
+
+    def _load_image(self, fields: Dict):
+        """Resolve a job's image reference into something YOLOv8 accepts"""
+        if fields.get('image_base64'):
+            image_data = base64.b64decode(fields['image_base64'])
+            return Image.open(io.BytesIO(image_data)).convert('RGB')
+
+        image_path = fields.get('image_path')
+        if not image_path or not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image not found: {image_path}")
+        return image_path
+
+    def _cached(self, fields: Dict) -> Optional[Dict]:
+        return self.cache.get(
+            image_path=fields.get('image_path'),
+            image_base64=fields.get('image_base64')
+        )
+
+    def _complete(self, entry_id: str, fields: Dict, result: Dict, status: str = 'done'):
+        """Store the result, notify the callback and acknowledge the entry"""
+        payload = dict(result)
+        payload['job_id'] = fields.get('job_id')
+        payload['status'] = status
+        payload['completed_at'] = datetime.utcnow().isoformat()
+
+        result_key = fields.get('result_key') or self.queue.result_key(fields.get('job_id'))
+        self.redis_client.setex(result_key, config.STREAM_RESULT_TTL, json.dumps(payload))
+        self.redis_client.xack(self.queue.stream, self.queue.group, entry_id)
+
+        if fields.get('callback_url'):
+            self._notify(fields['callback_url'], payload)
+
+    def _notify(self, callback_url: str, payload: Dict):
+        """POST the result to the job's callback URL (best effort)"""
+        try:
+            request = urllib.request.Request(
+                callback_url,
+                data=json.dumps(payload).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                method='POST'
+            )
+            urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            logger.warning(f"Callback to {callback_url} failed: {e}")
+
+    def _dead_letter(self, entry_id: str, fields: Dict, deliveries: int):
+        """Move a job that keeps failing to the dead-letter stream"""
+        logger.error(f"Job {fields.get('job_id')} failed {deliveries} times, dead-lettering")
+
+        dead_fields = {k: v for k, v in fields.items() if k != 'image_base64'}
+        dead_fields['original_id'] = entry_id
+        dead_fields['deliveries'] = str(deliveries)
+        self.redis_client.xadd(
+            self.queue.dead_letter, dead_fields, maxlen=config.STREAM_MAXLEN, approximate=True
+        )
+
+        self._complete(entry_id, fields, {
+            'success': False,
+            'message': f'Classification failed after {deliveries} attempts'
+        }, status='failed')
+
+    def _reclaim(self) -> List[Tuple[str, Dict]]:
+        """
+        Take over jobs left unacknowledged by crashed or failing workers
+
+        Returns:
+            Entries to retry; entries over the retry limit are dead-lettered
+        """
+        response = self.redis_client.xautoclaim(
+            self.queue.stream, self.queue.group, self.consumer,
+            min_idle_time=config.STREAM_CLAIM_IDLE_MS,
+            start_id='0-0',
+            count=self.batch_size
+        )
+        claimed = [(entry_id, fields) for entry_id, fields in response[1] if fields]
+
+        retry = []
+        for entry_id, fields in claimed:
+            info = self.redis_client.xpending_range(
+                self.queue.stream, self.queue.group, min=entry_id, max=entry_id, count=1
+            )
+            deliveries = info[0]['times_delivered'] if info else 1
+
+            if deliveries > config.STREAM_MAX_RETRIES:
+                self._dead_letter(entry_id, fields, deliveries)
+            else:
+                retry.append((entry_id, fields))
+
+        return retry
+
+    def _read(self) -> List[Tuple[str, Dict]]:
+        """Block for new jobs delivered to this consumer"""
+        response = self.redis_client.xreadgroup(
+            self.queue.group, self.consumer,
+            {self.queue.stream: '>'},
+            count=self.batch_size,
+            block=config.STREAM_BLOCK_MS
+        )
+        return [entry for _, entries in response for entry in entries]
+
+    def _predict_one(self, fields: Dict, image) -> Optional[List[Dict]]:
+        """Detections for a single job, or None if its inference fails"""
+        try:
+            return self.model_handler.predict_batch([image])[0]
+        except Exception as e:
+            logger.error(f"Job {fields.get('job_id')} failed: {e}", exc_info=True)
+            return None
+
+    def process_batch(self, entries: List[Tuple[str, Dict]]) -> int:
+        """
+        Classify a batch of jobs with one forward pass
+
+        Failed jobs are left unacknowledged so they are retried via
+        _reclaim after STREAM_CLAIM_IDLE_MS. If the batched forward pass
+        fails, each image is retried on its own so only the bad jobs stay
+        pending instead of the whole batch.
+
+        Returns:
+            Number of jobs completed
+        """
+        completed = 0
+        to_infer = []
+
+        for entry_id, fields in entries:
+            try:
+                cached_result = self._cached(fields)
+                if cached_result:
+                    self._complete(entry_id, fields, cached_result)
+                    completed += 1
+                    continue
+
+                to_infer.append((entry_id, fields, self._load_image(fields)))
+            except Exception as e:
+                logger.warning(f"Job {fields.get('job_id')} could not be prepared: {e}")
+
+        if not to_infer:
+            return completed
+
+        try:
+            batch_detections = self.model_handler.predict_batch([image for _, _, image in to_infer])
+        except Exception as e:
+            logger.warning(f"Batch of {len(to_infer)} jobs failed ({e}), retrying them one by one")
+            batch_detections = None
+
+        if batch_detections is None:
+            batch_detections = [self._predict_one(fields, image) for _, fields, image in to_infer]
+
+        for (entry_id, fields, _), detections in zip(to_infer, batch_detections):
+            if detections is None:
+                continue
+            result = self.classifier.classify_issue(detections)
+            self.cache.set(
+                result,
+                image_path=fields.get('image_path'),
+                image_base64=fields.get('image_base64')
+            )
+            self._complete(entry_id, fields, result)
+            completed += 1
+
+        return completed
+
+    def run_once(self) -> int:
+        """Retry stale jobs first, then read new ones"""
+        entries = self._reclaim()
+        if not entries:
+            entries = self._read()
+
+        if not entries:
+            return 0
+
+        return self.process_batch(entries)
+
+    def stop(self, *args):
+        self.running = False
+
+    def run(self):
+        """Consume jobs until stopped"""
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        logger.info(f"Stream worker {self.consumer} consuming {self.queue.stream}")
+
+        while self.running:
+            try:
+                processed = self.run_once()
+                if processed:
+                    logger.info(f"Worker {self.consumer} completed {processed} jobs")
+            except redis.ConnectionError as e:
+                logger.error(f"Redis connection lost: {e}, retrying in 1s")
+                time.sleep(1)
+
+        logger.info(f"Stream worker {self.consumer} stopped")
+
+
+def run_pool(num_workers: int):
+    """
+    Run a pool of stream workers sharing one preloaded model
+
+    The model is loaded before forking (see src.server), Redis connections
+    are opened in each worker after the fork.
+    """
+    from .model import get_model_handler
+    from .classifier import get_classification_service
+
+    get_model_handler()
+    get_classification_service()
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    alive = True
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                StreamWorker().run()
+            except Exception as e:
+                logger.error(f"Stream worker {os.getpid()} crashed: {e}", exc_info=True)
+                exit_code = 1
+            finally:
+                stop_logging()
+                os._exit(exit_code)
+        workers[pid] = time.time()
+
+    def handle_exit(signum, frame):
+        nonlocal alive
+        alive = False
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_exit)
+    signal.signal(signal.SIGINT, handle_exit)
+
+    for _ in range(max(1, num_workers)):
+        spawn()
+
+    while workers:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        started = workers.pop(pid, time.time())
+        if alive:
+            logger.warning(f"Stream worker {pid} exited, restarting")
+            if time.time() - started < 1:
+                time.sleep(1)
+            spawn()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis Streams classification workers")
+    parser.add_argument('--workers', type=int, default=config.STREAM_WORKERS)
+    args = parser.parse_args()
+
+    setup_logging()
+
+    if args.workers <= 1:
+        StreamWorker().run()
+    else:
+        run_pool(args.workers)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
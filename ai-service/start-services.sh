@@ -6,9 +6,20 @@ echo "🚀 Starting Combined AI + Robot Services..."
 
 # Start AI Service (FastAPI) on port 5000 in background
 echo "▶️  Starting AI Service (FastAPI) on port ${AI_PORT:-5000}..."
-uvicorn src.main:app --host 0.0.0.0 --port ${AI_PORT:-5000} &
+if [ "${WORKERS:-1}" -gt 1 ]; then
+    # Pre-forked workers share one copy of the model
+    python -m src.server --host 0.0.0.0 --port ${AI_PORT:-5000} --workers ${WORKERS} &
+else
+    uvicorn src.main:app --host 0.0.0.0 --port ${AI_PORT:-5000} &
+fi
 AI_PID=$!
 
+# Optional queue-driven classification workers (Redis Streams)
+if [ "${STREAM_WORKERS:-0}" -gt 0 ]; then
+    echo "▶️  Starting ${STREAM_WORKERS} classification stream workers..."
+    python -m src.stream_worker --workers ${STREAM_WORKERS} &
+fi
+
 # Wait a moment for AI service to initialize
 sleep 3
 
@@ -74,7 +74,8 @@ const analyzeImageComplete = async (imagePath) => {
 
 /**
  * Robot submission with base64 image
- * For autonomous robot surveys
+ * For autonomous robot surveys. The frame is queued: the response holds a
+ * job_id whose result is at GET /robot/jobs/:jobId (503 + Retry-After when busy)
  */
 const robotSubmit = async (imageBase64, latitude, longitude, robotId) => {
     try {
@@ -100,6 +101,38 @@ const robotSubmit = async (imageBase64, latitude, longitude, robotId) => {
     }
 };
 
+/**
+ * Robot submission with raw image bytes (Buffer)
+ * Avoids the base64 + JSON overhead of robotSubmit; same job response
+ */
+const robotSubmitFrame = async (imageBuffer, latitude, longitude, robotId) => {
+    try {
+        const response = await axios.post(
+            `${ROBOT_SERVICE_URL}/robot/frames`,
+            imageBuffer,
+            {
+                headers: {
+                    'Content-Type': 'image/jpeg',
+                    'X-Robot-Id': robotId,
+                    'X-Latitude': latitude,
+                    'X-Longitude': longitude
+                },
+                maxBodyLength: Infinity,
+                timeout: 30000
+            }
+        );
+
+        return {
+            success: true,
+            data: response.data
+        };
+
+    } catch (error) {
+        logger.error('Robot frame submit failed', { error: error.message });
+        throw error;
+    }
+};
+
 /**
  * Get robot surveys
  */
@@ -165,6 +198,7 @@ const checkRobotHealth = async () => {
 module.exports = {
     analyzeImageComplete,
     robotSubmit,
+    robotSubmitFrame,
     getRobotSurveys,
     getRobotStats,
     checkRobotHealth